@@ -17,25 +17,41 @@ branch_labels = None
 depends_on = None
 
 
+BACKFILL_BATCH_SIZE = 10000
+
+
 def upgrade() -> None:
     """
     Add title column to google_forms table
+
+    The column is added as nullable without a default (an INSTANT operation
+    on MySQL 8+), backfilled in small batches to keep transactions short,
+    and only then made NOT NULL.
     """
 
     op.add_column(
         "google_forms",
-        sa.Column(
-            "title",
-            sa.String(255),
-            nullable=False,
-            server_default="",  # temporary default for existing rows
-        ),
+        sa.Column("title", sa.String(255), nullable=True),
     )
 
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        backfill = sa.text(
+            "UPDATE google_forms SET title = '' WHERE title IS NULL LIMIT :limit"
+        )
+        # Commit every batch separately instead of holding one long transaction
+        with op.get_context().autocommit_block():
+            while bind.execute(backfill, {"limit": BACKFILL_BATCH_SIZE}).rowcount:
+                pass
+    else:
+        # UPDATE ... LIMIT is MySQL-specific
+        bind.execute(sa.text("UPDATE google_forms SET title = '' WHERE title IS NULL"))
+
     op.alter_column(
         "google_forms",
         "title",
-        server_default=None,
+        existing_type=sa.String(255),
+        nullable=False,
     )
 
 
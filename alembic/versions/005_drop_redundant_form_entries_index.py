@@ -0,0 +1,41 @@
+"""
+Drop redundant google_form_id index from form_entries table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Drop idx_form_entries_google_form_id
+
+    The unique constraint on (google_form_id, entry_id) already serves
+    lookups by google_form_id as a left-prefix index, so the standalone
+    index only adds write amplification on every insert.
+    """
+    op.drop_index(
+        "idx_form_entries_google_form_id",
+        table_name="form_entries",
+    )
+
+
+def downgrade() -> None:
+    """
+    Restore idx_form_entries_google_form_id
+    """
+    op.create_index(
+        "idx_form_entries_google_form_id",
+        "form_entries",
+        ["google_form_id"],
+    )
@@ -0,0 +1,43 @@
+"""
+Replace ab_tests single-column indexes with a composite index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Replace idx_ab_tests_short_url and idx_ab_tests_active with a composite
+    (short_url_id, is_active) index
+
+    The boolean index is too low-cardinality to be picked by the optimizer,
+    and the composite index serves lookups by short_url_id as a left prefix.
+    It is created first so the short_url_id foreign key stays indexed.
+    """
+    op.create_index(
+        "idx_ab_tests_short_url_active",
+        "ab_tests",
+        ["short_url_id", "is_active"],
+    )
+    op.drop_index("idx_ab_tests_active", table_name="ab_tests")
+    op.drop_index("idx_ab_tests_short_url", table_name="ab_tests")
+
+
+def downgrade() -> None:
+    """
+    Restore single-column ab_tests indexes
+    """
+    op.create_index("idx_ab_tests_short_url", "ab_tests", ["short_url_id"])
+    op.create_index("idx_ab_tests_active", "ab_tests", ["is_active"])
+    op.drop_index("idx_ab_tests_short_url_active", table_name="ab_tests")
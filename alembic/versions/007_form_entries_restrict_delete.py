@@ -0,0 +1,57 @@
+"""
+Switch form_entries.google_form_id foreign key to ON DELETE RESTRICT
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Replace the cascading foreign key with a restricting one
+
+    Form entries are deleted explicitly in batches before their form
+    (see GoogleFormsFieldMapper.delete_form), so a cascade is never needed.
+    """
+    op.drop_constraint(
+        "fk_form_entries_google_form_id",
+        "form_entries",
+        type_="foreignkey",
+    )
+    op.create_foreign_key(
+        "fk_form_entries_google_form_id",
+        "form_entries",
+        "google_forms",
+        ["google_form_id"],
+        ["id"],
+        ondelete="RESTRICT",
+    )
+
+
+def downgrade() -> None:
+    """
+    Restore the cascading foreign key
+    """
+    op.drop_constraint(
+        "fk_form_entries_google_form_id",
+        "form_entries",
+        type_="foreignkey",
+    )
+    op.create_foreign_key(
+        "fk_form_entries_google_form_id",
+        "form_entries",
+        "google_forms",
+        ["google_form_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
@@ -0,0 +1,73 @@
+"""
+Add trigram indexes for dashboard search on short_urls (PostgreSQL only)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create GIN trigram indexes on short_urls.short_code and short_urls.title
+
+    The dashboard searches with LIKE '%term%', which a B-tree index cannot
+    serve. pg_trgm GIN indexes can. short_urls is owned by Shlink, so the
+    indexes are only additive and are built concurrently to avoid blocking
+    Shlink's writes. Other databases are left untouched.
+    """
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_short_urls_short_code_trgm",
+            "short_urls",
+            ["short_code"],
+            postgresql_using="gin",
+            postgresql_ops={"short_code": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_short_urls_title_trgm",
+            "short_urls",
+            ["title"],
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Drop trigram search indexes (the pg_trgm extension is left installed)
+    """
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_short_urls_title_trgm",
+            table_name="short_urls",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "idx_short_urls_short_code_trgm",
+            table_name="short_urls",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
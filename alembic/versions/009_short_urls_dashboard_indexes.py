@@ -0,0 +1,72 @@
+"""
+Add indexes backing the dashboard filter and ordering on short_urls
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create idx_short_urls_date_created and, on PostgreSQL,
+    idx_short_urls_original_url_prefix
+
+    The dashboard orders by date_created DESC and paginates, so an index on
+    date_created lets the database walk rows in order instead of sorting the
+    whole table (B-trees scan backwards just as well). On PostgreSQL a
+    text_pattern_ops index also serves original_url LIKE 'prefix%' under any
+    collation. short_urls is owned by Shlink, so these are only additive and
+    are built concurrently on PostgreSQL.
+
+    The indexes belong to this service's migration history, not Shlink's;
+    see "Indexes on Shlink tables" in the readme.
+    """
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_short_urls_date_created",
+            "short_urls",
+            ["date_created"],
+            postgresql_concurrently=True,
+        )
+
+        if is_postgresql:
+            op.create_index(
+                "idx_short_urls_original_url_prefix",
+                "short_urls",
+                ["original_url"],
+                postgresql_ops={"original_url": "text_pattern_ops"},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """
+    Drop dashboard indexes from short_urls
+    """
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    with op.get_context().autocommit_block():
+        if is_postgresql:
+            op.drop_index(
+                "idx_short_urls_original_url_prefix",
+                table_name="short_urls",
+                postgresql_concurrently=True,
+            )
+
+        op.drop_index(
+            "idx_short_urls_date_created",
+            table_name="short_urls",
+            postgresql_concurrently=True,
+        )
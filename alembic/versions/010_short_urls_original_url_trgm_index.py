@@ -0,0 +1,64 @@
+"""
+Add trigram index for redirect lookups on short_urls.original_url (PostgreSQL only)
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create a GIN trigram index on short_urls.original_url
+
+    Every redirect matches original_url with ILIKE '%url%', because the
+    target URL sits inside the ?url= query parameter of a Shlink long URL.
+    Neither a B-tree nor a prefix index can serve that. pg_trgm GIN indexes
+    can, which turns the lookup from a sequential scan into an index scan.
+    short_urls is owned by Shlink, so no case-folded column is added: the
+    index is only additive and is built concurrently. Other databases are
+    left untouched.
+
+    The index belongs to this service's migration history, not Shlink's;
+    see "Indexes on Shlink tables" in the readme.
+    """
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_short_urls_original_url_trgm",
+            "short_urls",
+            ["original_url"],
+            postgresql_using="gin",
+            postgresql_ops={"original_url": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Drop the original_url trigram index (the pg_trgm extension is left installed)
+    """
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_short_urls_original_url_trgm",
+            table_name="short_urls",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
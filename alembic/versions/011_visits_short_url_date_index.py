@@ -0,0 +1,63 @@
+"""
+Add a composite index backing the last-visit lookup on visits
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create idx_visits_short_url_date on visits (short_url_id, date)
+
+    Every redirect reads the latest visit of a short URL (WHERE short_url_id
+    ORDER BY date DESC LIMIT 1). Shlink only indexes short_url_id and date
+    separately, so the database either reads all visits of the short URL and
+    sorts them, or walks the date index across every short URL. The composite
+    index answers it with a single backward index probe. visits is owned by
+    Shlink and is its busiest table, so the index is only additive and is
+    built without blocking writes: concurrently on PostgreSQL, online
+    (in-place, no lock) on MySQL.
+    """
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(
+            "CREATE INDEX idx_visits_short_url_date "
+            "ON visits (short_url_id, `date`) ALGORITHM=INPLACE LOCK=NONE"
+        )
+        return
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_visits_short_url_date",
+            "visits",
+            ["short_url_id", "date"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """
+    Drop idx_visits_short_url_date
+    """
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(
+            "DROP INDEX idx_visits_short_url_date ON visits ALGORITHM=INPLACE LOCK=NONE"
+        )
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_visits_short_url_date",
+            table_name="visits",
+            postgresql_concurrently=True,
+        )
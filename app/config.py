@@ -2,18 +2,25 @@
 Configuration management using environment variables
 """
 
-from pydantic import HttpUrl
+import os
+from pydantic import HttpUrl, TypeAdapter, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from functools import lru_cache
+
+# Set LOAD_DOTENV=false when the environment is injected by the orchestrator
+LOAD_DOTENV = os.getenv("LOAD_DOTENV", "true").lower() != "false"
 
 
 class Settings(BaseSettings):
     """Application settings from environment variables"""
 
-    app_url: HttpUrl
+    app_url: str
 
     # Database
     database_url: str
+    db_pool_size: int = 25
+    db_max_overflow: int = 25
+    db_pool_recycle: int = 1800  # 30 minutes
+    db_pool_timeout: int = 5  # seconds to wait for a free connection
 
     # Security
     admin_token: str
@@ -27,6 +34,7 @@ class Settings(BaseSettings):
     # Application
     app_name: str = "Shlink AB Tests"
     debug: bool = False
+    threadpool_size: int = 200  # Worker threads for sync (def) endpoints
 
     # Session
     session_cookie_name: str = "admin_session"
@@ -35,10 +43,33 @@ class Settings(BaseSettings):
     # A/B Testing
     click_id_max_age_seconds: int = 60  # 1 minute
 
-    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
+    # Redirect cache (per worker process; 0 disables it)
+    redirect_cache_ttl: int = 30  # seconds
+    redirect_cache_max_size: int = 10000
+
+    # Google Forms prefill parameters cache (per worker process; 0 disables it)
+    form_cache_ttl: int = 60  # seconds
+
+    model_config = SettingsConfigDict(
+        env_file=".env" if LOAD_DOTENV else None,
+        case_sensitive=False,
+        frozen=True,
+    )
+
+    @field_validator("app_url")
+    @classmethod
+    def validate_app_url(cls, value: str) -> str:
+        """Validate as HttpUrl once and keep the canonical string form"""
+        return str(TypeAdapter(HttpUrl).validate_python(value))
+
+
+# Resolved once at import; import this instead of calling get_settings() per request
+settings = Settings(**{})
+
+# Prefix of original_url for short URLs handled by this app
+APP_URL_PREFIX = settings.app_url.rstrip("/")
 
 
-@lru_cache()
 def get_settings() -> Settings:
-    """Get cached settings instance"""
-    return Settings(**{})
+    """Get settings instance"""
+    return settings
@@ -6,21 +6,29 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 from typing import Any, Generator
-from app.config import get_settings
+from app.config import settings
 
-settings = get_settings()
 
 # Create database engine
 engine = create_engine(
     settings.database_url,
+    pool_size=settings.db_pool_size,  # Persistent connections kept open
+    max_overflow=settings.db_max_overflow,  # Extra connections under bursts
+    pool_timeout=settings.db_pool_timeout,  # Fail fast instead of stalling
     pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,  # Recycle connections after 1 hour
+    pool_recycle=settings.db_pool_recycle,  # Recycle stale connections
     echo=settings.debug,  # Log SQL queries in debug mode
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Session factory for read-only request paths (redirects): loaded objects are
+# never expired, so nothing is re-selected after a commit
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -38,6 +46,22 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    Dependency for FastAPI to get a read-only database session
+
+    Usage:
+        @app.get("/")
+        def endpoint(db: Session = Depends(get_read_db)):
+            ...
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 @contextmanager
 def get_db_context() -> Generator[Session, Any, None]:
     """
@@ -3,16 +3,19 @@ Main FastAPI application
 """
 
 import logging
+import os
 from contextlib import asynccontextmanager
-from pathlib import Path
 from typing import Any, AsyncGenerator, Dict
+from urllib.parse import urlsplit
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 
 from app.routers import redirect, admin, sync
 from app.services.auth_service import AuthService
-from app.config import get_settings
+from app.config import settings
+from app.static_files import CachedStaticFiles
 
 # Configure logging
 logging.basicConfig(
@@ -20,8 +23,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-settings = get_settings()
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
@@ -31,6 +32,13 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
         f"Database: {settings.database_url.split('@')[-1]}"
     )  # Log without credentials
 
+    # DB handlers are plain def and run in AnyIO's threadpool, which defaults
+    # to 40 threads; raise it so bursts of redirects don't queue behind it
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+
+    compiled = admin.preload_templates()
+    logger.info(f"Compiled {compiled} templates")
+
     yield
 
     # Cleanup
@@ -46,15 +54,19 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Add CORS middleware if needed
+# Add CORS middleware restricted to the app's own origin
+app_url = urlsplit(settings.app_url)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[f"{app_url.scheme}://{app_url.netloc}"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "x-api-token"],
 )
 
+# Compress HTML and sync JSON payloads; tiny redirect responses are left as is
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(admin.router, tags=["Admin"])
 app.include_router(redirect.router, tags=["Redirect"])
@@ -67,6 +79,6 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-public_dir = Path(__file__).parent.parent / "public"
-if public_dir.exists():
-    app.mount("/", StaticFiles(directory=public_dir), name="static")
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "public")
+if os.path.isdir(PUBLIC_DIR):
+    app.mount("/", CachedStaticFiles(directory=PUBLIC_DIR), name="static")
@@ -11,6 +11,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     CheckConstraint,
+    func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -35,18 +36,17 @@ class ABTest(Base):
     probability: Mapped[float] = mapped_column(Float, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now
+        DateTime, nullable=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now, onupdate=datetime.now
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
     )
 
     # Relationships
     short_url: Mapped["ShortUrl"] = relationship("ShortUrl", back_populates="ab_tests")
 
     __table_args__ = (
-        Index("idx_ab_tests_short_url", "short_url_id"),
-        Index("idx_ab_tests_active", "is_active"),
+        Index("idx_ab_tests_short_url_active", "short_url_id", "is_active"),
         CheckConstraint(
             "probability >= 0.0 AND probability <= 1.0",
             name="chk_probability_range",
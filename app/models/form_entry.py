@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -26,18 +27,17 @@ class FormEntry(Base):
 
     google_form_id: Mapped[int] = mapped_column(
         Integer,
-        ForeignKey("google_forms.id", ondelete="CASCADE"),
+        ForeignKey("google_forms.id", ondelete="RESTRICT"),
         nullable=False,
-        index=True,
     )
     entry_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now
+        DateTime, nullable=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now, onupdate=datetime.now
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
     )
 
     google_form: Mapped["GoogleForm"] = relationship(
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Integer,
     String,
     DateTime,
+    func,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -34,15 +35,15 @@ class GoogleForm(Base):
     )
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now
+        DateTime, nullable=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, nullable=False, default=datetime.now, onupdate=datetime.now
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
     )
 
     entries: Mapped[List["FormEntry"]] = relationship(
         "FormEntry",
         back_populates="google_form",
-        cascade="all, delete-orphan",
-        passive_deletes=True,
+        # Entries are removed in batches by GoogleFormsFieldMapper.delete_form
+        passive_deletes="all",
     )
@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import cached_property
 from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import (
@@ -43,7 +44,7 @@ class ShortUrl(Base):
     # Relationships
     visits: Mapped[list["Visit"]] = relationship("Visit", back_populates="short_url")
     ab_tests: Mapped[list["ABTest"]] = relationship(
-        "ABTest", back_populates="short_url"
+        "ABTest", back_populates="short_url", order_by="ABTest.created_at"
     )
 
     __table_args__ = (
@@ -51,3 +52,10 @@ class ShortUrl(Base):
         Index("IDX_4A53F934115F0EE5", "domain_id"),
         Index("IDX_4A53F934C9EA6E08", "author_api_key_id"),
     )
+
+    @cached_property
+    def redirect_url(self) -> Optional[str]:
+        """Redirect URL extracted from original_url"""
+        from app.services.url_builder import UrlBuilder
+
+        return UrlBuilder.get_redirect_url(self.original_url)
@@ -2,33 +2,87 @@
 Router for admin dashboard and A/B test management
 """
 
-from datetime import datetime, timezone
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 import logging
-from typing import Optional
-from fastapi import APIRouter, Depends, Request, HTTPException, Form, Cookie, Response
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from typing import Any, Dict, Optional, Tuple
+from fastapi import (
+    APIRouter,
+    Depends,
+    Request,
+    HTTPException,
+    Form,
+    Cookie,
+    Query,
+    Response,
+)
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import select
+from sqlalchemy.orm import Session, raiseload, selectinload
 
 from app.database import get_db
-from app.models import ShortUrl, ABTest, GoogleForm
+from app.models import ShortUrl, GoogleForm
 from app.schemas import (
     ABTestCreate,
     ABTestUpdate,
-    ABTestResponse,
     ShortUrlWithTests,
 )
 from app.services.ab_test_service import ABTestService, ABTestValidationError
 from app.services.auth_service import AuthService
-from app.services.google_forms import get_forms_mapper
-from app.config import get_settings
+from app.services.google_forms import GoogleFormsFieldMapper, get_forms_mapper
+from app.config import APP_URL_PREFIX, settings
 from app.services.url_builder import UrlBuilder
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
 router = APIRouter(prefix="/admin")
 templates = Jinja2Templates(directory="templates")
+# Share compiled templates across workers; only watch for edits in debug mode
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+templates.env.auto_reload = settings.debug
+
+
+def preload_templates() -> int:
+    """
+    Compile all admin templates so the first request does not pay for it
+
+    Returns:
+        Number of templates compiled
+    """
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+
+    return len(names)
+
+
+def stream_template(
+    request: Request, name: str, context: Dict[str, Any]
+) -> StreamingResponse:
+    """
+    Render a template chunk by chunk instead of building the whole page first
+
+    The context must not hold ORM objects that could lazy-load, since the
+    database session may be closed while the body is still being generated.
+
+    Args:
+        request: FastAPI request (exposed to the template as `request`)
+        name: Template name
+        context: Template context
+
+    Returns:
+        Streaming HTML response
+    """
+    template = templates.get_template(name)
+    return StreamingResponse(
+        template.generate({"request": request, **context}), media_type="text/html"
+    )
 
 
 def verify_admin_session(
@@ -117,11 +171,31 @@ async def logout(session: str = Depends(verify_admin_session)) -> RedirectRespon
 # ==================== Dashboard Routes ====================
 
 
+def _encode_cursor(date_created: datetime, short_url_id: int) -> str:
+    """Encode the last row's sort key as an opaque dashboard cursor"""
+    raw = f"{date_created.isoformat()}|{short_url_id}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a dashboard cursor into (date_created, id)
+
+    Raises:
+        HTTPException: If cursor is malformed
+    """
+    try:
+        date_part, id_part = urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(date_part), int(id_part)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(
+def dashboard(
     request: Request,
-    page: int = 1,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = None,
     session: str | RedirectResponse = Depends(verify_admin_session_html),
     db: Session = Depends(get_db),
@@ -131,8 +205,8 @@ async def dashboard(
 
     Args:
         request: FastAPI request
-        page: Page number (1-indexed)
-        limit: Items per page
+        cursor: Opaque keyset cursor of the last row on the previous page
+        limit: Items per page (1-100)
         search: Search query for short_code or title
         session: Admin session token
         db: Database session
@@ -144,9 +218,11 @@ async def dashboard(
         return session
 
     # Build query
-    settings = get_settings()
-    app_url = str(settings.app_url).rstrip("/")
-    query = select(ShortUrl).where(ShortUrl.original_url.startswith(app_url))
+    query = (
+        select(ShortUrl)
+        .options(raiseload("*"))
+        .where(ShortUrl.original_url.startswith(APP_URL_PREFIX))
+    )
 
     if search:
         search_pattern = f"%{search}%"
@@ -155,50 +231,56 @@ async def dashboard(
             | (ShortUrl.title.like(search_pattern))
         )
 
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_count = db.execute(count_query).scalar()
-
-    if total_count is None:
-        total_count = 0
+    # Keyset pagination: seek past the previous page's last (date_created, id)
+    if cursor:
+        after_created, after_id = _decode_cursor(cursor)
+        query = query.where(
+            (ShortUrl.date_created < after_created)
+            | ((ShortUrl.date_created == after_created) & (ShortUrl.id < after_id))
+        )
 
-    # Paginate
-    offset = (page - 1) * limit
-    query = query.order_by(ShortUrl.date_created.desc()).offset(offset).limit(limit)
+    # Fetch one extra row to learn whether another page follows
+    query = query.order_by(ShortUrl.date_created.desc(), ShortUrl.id.desc()).limit(
+        limit + 1
+    )
 
     short_urls = list(db.execute(query).scalars().all())
+    has_more = len(short_urls) > limit
+    short_urls = short_urls[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = short_urls[-1]
+        next_cursor = _encode_cursor(last.date_created, last.id)
 
-    # Enrich with A/B test data
+    # Enrich with A/B test counts and probabilities aggregated in SQL.
+    # Rows come straight from the database, so skip pydantic validation.
+    test_stats = ABTestService(db).get_test_stats([url.id for url in short_urls])
     enriched_urls = []
     for url in short_urls:
-        ab_tests = ABTestService(db).get_all_tests(url.id)
-        total_prob = sum(t.probability for t in ab_tests if t.is_active)
+        test_count, total_prob = test_stats.get(url.id, (0, 0.0))
 
         enriched_urls.append(
-            ShortUrlWithTests(
+            ShortUrlWithTests.model_construct(
                 id=url.id,
                 short_code=url.short_code,
                 original_url=url.original_url,
-                redirect_url=UrlBuilder.get_redirect_url(url.original_url),
+                redirect_url=url.redirect_url,
                 title=url.title,
                 date_created=url.date_created,
                 max_visits=url.max_visits,
-                ab_tests=[ABTestResponse.model_validate(t) for t in ab_tests],
+                ab_test_count=test_count,
                 total_probability=total_prob,
             )
         )
 
-    # Calculate pagination
-    total_pages = (total_count + limit - 1) // limit
-
-    return templates.TemplateResponse(
+    return stream_template(
+        request,
         "dashboard.html",
         {
-            "request": request,
             "short_urls": enriched_urls,
-            "page": page,
-            "total_pages": total_pages,
-            "total_count": total_count,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
             "search": search or "",
             "limit": limit,
         },
@@ -206,7 +288,7 @@ async def dashboard(
 
 
 @router.get("/short_url/{short_url_id}", response_class=HTMLResponse)
-async def view_short_url(
+def view_short_url(
     request: Request,
     short_url_id: int,
     session: str | RedirectResponse = Depends(verify_admin_session_html),
@@ -227,18 +309,22 @@ async def view_short_url(
     if isinstance(session, RedirectResponse):
         return session
 
-    short_url = db.get(ShortUrl, short_url_id)
+    short_url = db.get(
+        ShortUrl,
+        short_url_id,
+        options=[selectinload(ShortUrl.ab_tests), raiseload("*")],
+    )
     if not short_url:
         raise HTTPException(status_code=404, detail="Short URL not found")
 
-    ab_tests = ABTestService(db).get_all_tests(short_url_id)
+    ab_tests = short_url.ab_tests
     total_prob = sum(t.probability for t in ab_tests if t.is_active)
-    redirect_url = UrlBuilder.get_redirect_url(short_url.original_url)
+    redirect_url = short_url.redirect_url
 
     return templates.TemplateResponse(
+        request,
         "short_url_detail.html",
         {
-            "request": request,
             "short_url": short_url,
             "redirect_url": redirect_url,
             "ab_tests": ab_tests,
@@ -252,7 +338,7 @@ async def view_short_url(
 
 
 @router.get("/google_forms", response_class=HTMLResponse)
-async def google_forms_page(
+def google_forms_page(
     request: Request,
     session: str | RedirectResponse = Depends(verify_admin_session_html),
     db: Session = Depends(get_db),
@@ -275,16 +361,16 @@ async def google_forms_page(
     google_forms = list(db.execute(query).scalars().all())
 
     return templates.TemplateResponse(
+        request,
         "google_forms.html",
         {
-            "request": request,
             "google_forms": google_forms,
         },
     )
 
 
 @router.post("/google_forms/add")
-async def add_google_form(
+def add_google_form(
     edit_url: str = Form(...),
     session: str = Depends(verify_admin_session),
     db: Session = Depends(get_db),
@@ -310,11 +396,11 @@ async def add_google_form(
             )
 
         # Check if form already exists
-        existing = db.execute(
-            select(GoogleForm).where(GoogleForm.form_id == form_id)
-        ).scalar_one_or_none()
+        existing_id = db.scalar(
+            select(GoogleForm.id).where(GoogleForm.form_id == form_id)
+        )
 
-        if existing:
+        if existing_id is not None:
             return RedirectResponse(
                 url="/admin/google_forms?error=This form is already added.",
                 status_code=303,
@@ -341,16 +427,7 @@ async def add_google_form(
             )
 
         form_title = form_data.get("title", "")
-        google_form = GoogleForm(
-            form_id=form_id,
-            responder_form_id=responder_id,
-            title=form_title,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
-        )
-
-        db.add(google_form)
-        db.commit()
+        GoogleFormsFieldMapper.upsert_form(db, form_id, responder_id, form_title)
 
         mapper.update_mapping(db, form_id, form_data)
 
@@ -369,8 +446,97 @@ async def add_google_form(
         )
 
 
+def _apply_form_data(
+    db: Session,
+    mapper: GoogleFormsFieldMapper,
+    google_form: GoogleForm,
+    form_data: Optional[Dict[str, Any]],
+) -> Optional[str]:
+    """
+    Update a stored Google Form and its field mappings from fetched API data
+
+    Args:
+        db: Database session
+        mapper: Google Forms field mapper
+        google_form: Stored Google Form
+        form_data: Form data returned by the API, None if the fetch failed
+
+    Returns:
+        Error message, or None on success
+    """
+    if not form_data:
+        return "Unable to access form. Check API permissions."
+
+    # Extract and verify responder ID
+    responder_uri = form_data.get("prefilledUrl", "")
+    responder_id = UrlBuilder.extract_form_id(responder_uri)
+
+    if not responder_id:
+        return "Unable to extract responder ID"
+
+    # Update if changed
+    form_title = form_data.get("title", "")
+    if responder_id != google_form.responder_form_id or form_title != google_form.title:
+        google_form.responder_form_id = responder_id
+        google_form.title = form_title
+
+        logger.info(f"Updating form {google_form.form_id}")
+
+        db.commit()
+
+    mapper.update_mapping(db, google_form.form_id, form_data)
+    return None
+
+
+@router.post("/google_forms/refresh_all")
+def refresh_all_google_forms(
+    session: str = Depends(verify_admin_session),
+    db: Session = Depends(get_db),
+) -> JSONResponse:
+    """
+    Refresh every Google Form, fetching them from the API in batches
+
+    Forms are fetched with GoogleFormsFieldMapper.get_forms_bulk; database
+    updates are then applied one form at a time.
+
+    Args:
+        session: Admin session token
+        db: Database session
+
+    Returns:
+        JSON response with per-form errors
+    """
+    google_forms = list(db.execute(select(GoogleForm)).scalars().all())
+    mapper = get_forms_mapper()
+
+    fetched = mapper.get_forms_bulk(
+        [google_form.form_id for google_form in google_forms]
+    )
+
+    errors: Dict[str, str] = {}
+    for google_form in google_forms:
+        edit_form_id = google_form.form_id
+        try:
+            error = _apply_form_data(db, mapper, google_form, fetched.get(edit_form_id))
+        except Exception as e:
+            logger.error(f"Error refreshing Google Form {edit_form_id}: {e}")
+            db.rollback()
+            error = str(e)
+
+        if error:
+            errors[edit_form_id] = error
+
+    return JSONResponse(
+        content={
+            "success": not errors,
+            "refreshed": len(google_forms) - len(errors),
+            "errors": errors,
+        }
+    )
+
+
 @router.post("/google_forms/{form_id}/refresh")
-async def refresh_google_form(
+def refresh_google_form(
     form_id: int,
     session: str = Depends(verify_admin_session),
     db: Session = Depends(get_db),
@@ -398,47 +564,15 @@ async def refresh_google_form(
         mapper = get_forms_mapper()
         form_data = mapper.get_form(google_form.form_id)
 
-        if not form_data:
-            return JSONResponse(
-                content={
-                    "success": False,
-                    "error": "Unable to access form. Check API permissions.",
-                }
-            )
-
-        # Extract and verify responder ID
-        responder_uri = form_data.get("prefilledUrl", "")
-        responder_id = UrlBuilder.extract_form_id(responder_uri)
-
-        if not responder_id:
-            return JSONResponse(
-                content={
-                    "success": False,
-                    "error": "Unable to extract responder ID",
-                }
-            )
-
-        # Update if changed
-        form_title = form_data.get("title", "")
-        if (
-            responder_id != google_form.responder_form_id
-            or form_title != google_form.title
-        ):
-            google_form.responder_form_id = responder_id
-            google_form.title = form_title
-            google_form.updated_at = datetime.now(timezone.utc)
-
-            logger.info(f"Updating form {google_form.form_id}")
-
-            db.commit()
-
-        mapper.update_mapping(db, google_form.form_id, form_data)
+        error = _apply_form_data(db, mapper, google_form, form_data)
+        if error:
+            return JSONResponse(content={"success": False, "error": error})
 
         return JSONResponse(
             content={
                 "success": True,
                 "message": "Form refreshed successfully",
-                "responder_id": responder_id,
+                "responder_id": google_form.responder_form_id,
             }
         )
 
@@ -451,7 +585,7 @@ async def refresh_google_form(
 
 
 @router.post("/google_forms/{form_id}/delete")
-async def delete_google_form(
+def delete_google_form(
     form_id: int,
     session: str = Depends(verify_admin_session),
     db: Session = Depends(get_db),
@@ -474,10 +608,10 @@ async def delete_google_form(
             status_code=303,
         )
 
-    db.delete(google_form)
-    db.commit()
+    edit_form_id = google_form.form_id
+    GoogleFormsFieldMapper.delete_form(db, form_id)
 
-    logger.info(f"Deleted Google Form: {google_form.form_id}")
+    logger.info(f"Deleted Google Form: {edit_form_id}")
 
     return RedirectResponse(
         url="/admin/google_forms?success=Form deleted successfully",
@@ -489,7 +623,7 @@ async def delete_google_form(
 
 
 @router.post("/short_url/{short_url_id}/ab_test")
-async def create_ab_test(
+def create_ab_test(
     short_url_id: int,
     target_url: str = Form(...),
     probability: float = Form(...),
@@ -533,7 +667,7 @@ async def create_ab_test(
 
 
 @router.post("/ab_test/{test_id}/update")
-async def update_ab_test(
+def update_ab_test(
     test_id: int,
     target_url: Optional[str] = Form(None),
     probability: Optional[float] = Form(None),
@@ -555,37 +689,36 @@ async def update_ab_test(
     Returns:
         Redirect to short URL detail page
     """
+    # No read before update_test: it has to lock the short URL first
     try:
-        service = ABTestService(db)
-        ab_test = service.get_test_by_id(test_id)
-
-        if not ab_test:
-            raise HTTPException(status_code=404, detail="A/B test not found")
-
         test_data = ABTestUpdate(
             target_url=target_url, probability=probability, is_active=is_active
         )
 
+        service = ABTestService(db)
         ab_test = service.update_test(test_id, test_data)
 
         logger.info(f"Updated A/B test {test_id}")
 
         return RedirectResponse(
-            url=f"/admin/short_url/{ab_test.short_url_id}?success=Test updated successfully",
+            url=f"/admin/short_url/{ab_test.short_url_id}"
+            "?success=Test updated successfully",
             status_code=303,
         )
     except ABTestValidationError as e:
+        # Release the short URL lock; the error already names the short URL
+        db.rollback()
+        if e.short_url_id is None:
+            raise HTTPException(status_code=404, detail="A/B test not found")
+
         logger.error(f"Failed to update A/B test: {e}")
-        # Try to get short_url_id for redirect
-        test = db.get(ABTest, test_id)
-        short_url_id = test.short_url_id if test else 0
         return RedirectResponse(
-            url=f"/admin/short_url/{short_url_id}?error={str(e)}", status_code=303
+            url=f"/admin/short_url/{e.short_url_id}?error={str(e)}", status_code=303
         )
 
 
 @router.post("/ab_test/{test_id}/delete")
-async def delete_ab_test(
+def delete_ab_test(
     test_id: int,
     session: str = Depends(verify_admin_session),
     db: Session = Depends(get_db),
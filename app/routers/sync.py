@@ -2,16 +2,22 @@
 Data sync API router for Google Apps Script integration
 """
 
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Header, Query
-from sqlalchemy.orm import Session, joinedload
+import hashlib
+import secrets
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from sqlalchemy import Label, case, func, null, select, text
+from sqlalchemy.orm import Query as OrmQuery, Session
 
 from app.database import get_db
-from app.config import get_settings
+from app.config import settings
 from app.models.short_url import ShortUrl
 from app.models.visit import Visit
 from app.models.visit_location import VisitLocation
 from app.schemas import (
+    AnyVisitLocationSchema,
+    EmptyVisitLocationSchema,
     ShortUrlSyncSchema,
     VisitWithLocationSchema,
     SyncResponse,
@@ -19,56 +25,226 @@ from app.schemas import (
 )
 
 router = APIRouter(prefix="/sync")
-settings = get_settings()
+
+# Expected X-Api-Token, encoded once for constant-time comparison
+API_TOKEN_BYTES = settings.api_token.encode()
+
+# Seconds an unfiltered table total is reused before it is counted again
+TOTAL_CACHE_TTL = 60.0
+
+# Unfiltered table totals: table name -> (expiry monotonic time, total)
+_total_cache: Dict[str, Tuple[float, int]] = {}
+
+# Pages are fetched as plain column rows and wrapped with model_construct:
+# no ORM objects, identity map or per-field validation for up to 10k records.
+# Attribute names match column names on these read-only Shlink tables.
+SHORT_URL_COLUMNS = tuple(ShortUrl.__table__.columns)
+VISIT_COLUMNS = tuple(Visit.__table__.columns)
+LOCATION_COLUMNS = tuple(VisitLocation.__table__.columns)
+
+# Prefix for visit_locations columns selected alongside visits
+LOCATION_PREFIX = "location_"
+
+# Columns an empty location still serializes (see EmptyVisitLocationSchema)
+EMPTY_LOCATION_FIELDS = ("id", "is_empty")
+
+
+def location_columns(prefix: str = "") -> Tuple["Label[Any]", ...]:
+    """
+    visit_locations columns labelled with prefix
+
+    Empty locations serialize only EMPTY_LOCATION_FIELDS, so their other
+    columns are replaced with NULL in SQL instead of being transferred.
+    """
+    return tuple(
+        (
+            column
+            if column.name in EMPTY_LOCATION_FIELDS
+            else case((VisitLocation.is_empty.is_(True), null()), else_=column)
+        ).label(prefix + column.name)
+        for column in LOCATION_COLUMNS
+    )
+
+
+def build_location(values: Dict[str, Any]) -> AnyVisitLocationSchema:
+    """Wrap a visit_locations row in the schema matching its is_empty flag"""
+    if values["is_empty"]:
+        return EmptyVisitLocationSchema.model_construct(id=values["id"])
+
+    return VisitLocationSchema.model_construct(**values)
+
+
+def count_total(
+    db: Session, query: "OrmQuery[Any]", table_name: str, filtered: bool
+) -> int:
+    """
+    Count rows for a sync response
+
+    Filtered queries are counted exactly. Unfiltered totals are cached for
+    TOTAL_CACHE_TTL seconds and, on PostgreSQL, read from the planner's
+    pg_class.reltuples estimate instead of a full COUNT(*).
+
+    Args:
+        db: Database session
+        query: Query to count
+        table_name: Table the query reads from
+        filtered: Whether the query has filters applied
+
+    Returns:
+        Total number of rows (estimated for unfiltered PostgreSQL tables)
+    """
+    if filtered:
+        return query.count()
+
+    now = time.monotonic()
+    cached = _total_cache.get(table_name)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total: Optional[int] = None
+    if db.get_bind().dialect.name == "postgresql":
+        total = db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": table_name},
+        )
+
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    if total is None or total < 0:
+        total = query.count()
+
+    _total_cache[table_name] = (now + TOTAL_CACHE_TTL, total)
+    return total
+
+
+def page_etag(
+    db: Session, request: Request, page_ids: OrmQuery[Any], with_locations: bool
+) -> str:
+    """
+    ETag for a visits or visit-locations sync page
+
+    Shlink appends visits and locations but also deletes them (visit
+    cleanup, cascades from deleted short URLs), so the tag is derived from
+    the page's own ID window: its row count and highest ID. A deleted row
+    inside the window shrinks the count or pulls a later row into it, and
+    appended rows only matter once they fall inside it. Visit pages also
+    include the highest location ID, since Shlink attaches locations to
+    existing visits after the fact. The window is read from the primary
+    key index and is at most `limit` rows.
+
+    Args:
+        db: Database session
+        request: Incoming sync request
+        page_ids: Query selecting the IDs of the requested page
+        with_locations: Whether the page embeds visit locations
+
+    Returns:
+        Quoted strong ETag
+    """
+    window = page_ids.subquery()
+    marker = select(func.count(), func.max(window.c.id)).select_from(window)
+    if with_locations:
+        marker = marker.add_columns(
+            select(func.max(VisitLocation.id)).scalar_subquery()
+        )
+
+    values = ":".join(str(value) for value in db.execute(marker).one())
+    key = f"{values}:{request.url.path}?{request.url.query}"
+    return f'"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already carries etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    return etag in (tag.strip() for tag in if_none_match.split(","))
 
 
 def verify_api_token(x_api_token: str = Header(...)) -> None:
     """Verify the API token"""
-    if x_api_token != settings.api_token:
+    if not secrets.compare_digest(x_api_token.encode(), API_TOKEN_BYTES):
         raise HTTPException(status_code=401, detail="Invalid api token")
 
 
 @router.get("/short-urls", response_model=SyncResponse)
 def sync_short_urls(
     limit: int = Query(500, ge=1, le=10000, description="Number of records to fetch"),
-    offset: int = Query(0, ge=0, description="Number of records to skip"),
+    offset: int = Query(
+        0,
+        ge=0,
+        deprecated=True,
+        description="Number of records to skip (deprecated: pass min_id=next_cursor)",
+    ),
+    min_id: Optional[int] = Query(
+        None, description="Fetch short URLs with ID greater than this (cursor)"
+    ),
+    include_total: bool = Query(
+        False,
+        description="Include the total row count (always included without min_id)",
+    ),
     db: Session = Depends(get_db),
     _: None = Depends(verify_api_token),
 ) -> SyncResponse:
     """
-    Fetch short URLs for sync with pagination
+    Fetch short URLs for sync with keyset pagination
+
+    Pass the previous page's next_cursor as min_id to get the next page.
 
     Headers:
         X-Api-Token: API key for authentication
     """
-    # Get total count
-    total = db.query(ShortUrl).count()
+    query = db.query(ShortUrl)
+
+    # Total of the whole table, counted on request or for offset paging
+    total = None
+    if include_total or min_id is None:
+        total = count_total(db, query, ShortUrl.__tablename__, filtered=False)
+
+    if min_id is not None:
+        query = query.filter(ShortUrl.id > min_id)
 
     # Fetch paginated data
-    short_urls = (
-        db.query(ShortUrl).order_by(ShortUrl.id).offset(offset).limit(limit).all()
+    rows = (
+        query.with_entities(*SHORT_URL_COLUMNS)
+        .order_by(ShortUrl.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
     )
 
     return SyncResponse(
         total=total,
         limit=limit,
         offset=offset,
-        data=[ShortUrlSyncSchema.model_validate(url) for url in short_urls],
+        next_cursor=rows[-1].id if rows else None,
+        data=[ShortUrlSyncSchema.model_construct(**row._asdict()) for row in rows],
     )
 
 
 @router.get("/visits", response_model=SyncResponse)
 def sync_visits(
+    request: Request,
+    response: Response,
     limit: int = Query(500, ge=1, le=10000, description="Number of records to fetch"),
-    offset: int = Query(0, ge=0, description="Number of records to skip"),
+    offset: int = Query(
+        0,
+        ge=0,
+        deprecated=True,
+        description="Number of records to skip (deprecated: pass min_id=next_cursor)",
+    ),
     short_url_id: Optional[int] = Query(None, description="Filter by short URL ID"),
     min_id: Optional[int] = Query(
         None,
         description="Fetch visits with ID greater than this (for append-only sync)",
     ),
+    include_total: bool = Query(
+        False,
+        description="Include the total row count (always included without min_id)",
+    ),
     db: Session = Depends(get_db),
     _: None = Depends(verify_api_token),
-) -> SyncResponse:
+) -> Union[SyncResponse, Response]:
     """
     Fetch visits with location data for sync
 
@@ -79,12 +255,16 @@ def sync_visits(
 
     Query Parameters:
         limit: Number of records to return (default 500, max 10000)
-        offset: Number of records to skip (default 0)
+        offset: Number of records to skip (default 0, deprecated)
         short_url_id: Filter visits for a specific short URL
-        min_id: Fetch only visits with ID > this value (for incremental sync)
+        min_id: Fetch only visits with ID > this value; pass the previous
+            page's next_cursor to paginate
+
+    Conditional requests (any If-None-Match header) get an ETag back; send
+    it as If-None-Match next time to get a 304 when the page hasn't
+    changed. Plain requests skip the ETag lookup entirely.
     """
-    # Build query with location joined
-    query = db.query(Visit).options(joinedload(Visit.location))
+    query = db.query(Visit)
 
     # Apply filters
     if short_url_id is not None:
@@ -93,33 +273,85 @@ def sync_visits(
     if min_id is not None:
         query = query.filter(Visit.id > min_id)
 
-    # Get total count with filters applied
-    total = query.count()
+    if "if-none-match" in request.headers:
+        page_ids = (
+            query.with_entities(Visit.id).order_by(Visit.id).offset(offset).limit(limit)
+        )
+        etag = page_etag(db, request, page_ids, with_locations=True)
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    # Get total count with filters applied, on request or for offset paging
+    total = None
+    if include_total or min_id is None:
+        filtered = short_url_id is not None or min_id is not None
+        total = count_total(db, query, Visit.__tablename__, filtered)
+
+    # Fetch paginated data with location joined, ordered by ID for consistency
+    rows = (
+        query.outerjoin(Visit.location)
+        .with_entities(
+            *VISIT_COLUMNS,
+            *location_columns(LOCATION_PREFIX),
+        )
+        .order_by(Visit.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
 
-    # Fetch paginated data ordered by ID for consistency
-    visits = query.order_by(Visit.id).offset(offset).limit(limit).all()
+    visits = []
+    for row in rows:
+        values = row._asdict()
+        location = {
+            column.name: values.pop(LOCATION_PREFIX + column.name)
+            for column in LOCATION_COLUMNS
+        }
+        visits.append(
+            VisitWithLocationSchema.model_construct(
+                **values,
+                location=(
+                    build_location(location) if location["id"] is not None else None
+                ),
+            )
+        )
 
     return SyncResponse(
         total=total,
         limit=limit,
         offset=offset,
-        data=[VisitWithLocationSchema.model_validate(visit) for visit in visits],
+        next_cursor=rows[-1].id if rows else None,
+        data=visits,
     )
 
 
 @router.get("/visit-locations", response_model=SyncResponse)
 def sync_visit_locations(
+    request: Request,
+    response: Response,
     limit: int = Query(500, ge=1, le=10000, description="Number of records to fetch"),
-    offset: int = Query(0, ge=0, description="Number of records to skip"),
+    offset: int = Query(
+        0,
+        ge=0,
+        deprecated=True,
+        description="Number of records to skip (deprecated: pass min_id=next_cursor)",
+    ),
     min_id: Optional[int] = Query(
         None, description="Fetch locations with ID greater than this"
     ),
+    include_total: bool = Query(
+        False,
+        description="Include the total row count (always included without min_id)",
+    ),
     db: Session = Depends(get_db),
     _: None = Depends(verify_api_token),
-) -> SyncResponse:
+) -> Union[SyncResponse, Response]:
     """
     Fetch visit locations for sync (if needed separately)
 
+    Conditional requests get an ETag back (see sync_visits).
+
     Headers:
         X-Api-Token: API key for authentication
     """
@@ -128,13 +360,35 @@ def sync_visit_locations(
     if min_id is not None:
         query = query.filter(VisitLocation.id > min_id)
 
-    total = query.count()
+    if "if-none-match" in request.headers:
+        page_ids = (
+            query.with_entities(VisitLocation.id)
+            .order_by(VisitLocation.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        etag = page_etag(db, request, page_ids, with_locations=False)
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    total = None
+    if include_total or min_id is None:
+        filtered = min_id is not None
+        total = count_total(db, query, VisitLocation.__tablename__, filtered)
 
-    locations = query.order_by(VisitLocation.id).offset(offset).limit(limit).all()
+    rows = (
+        query.with_entities(*location_columns())
+        .order_by(VisitLocation.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
 
     return SyncResponse(
         total=total,
         limit=limit,
         offset=offset,
-        data=[VisitLocationSchema.model_validate(loc) for loc in locations],
+        next_cursor=rows[-1].id if rows else None,
+        data=[build_location(row._asdict()) for row in rows],
     )
@@ -3,8 +3,8 @@ Pydantic schemas for request/response validation
 """
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, ConfigDict, Field, model_serializer
+from typing import Any, List, Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ABTestBase(BaseModel):
@@ -62,6 +62,7 @@ class ShortUrlWithTests(ShortUrlResponse):
     """Schema for short URL with A/B tests"""
 
     ab_tests: list[ABTestResponse] = []
+    ab_test_count: int = 0
     total_probability: float = Field(default=0.0)
 
     model_config = ConfigDict(
@@ -85,6 +86,15 @@ class RedirectStats(BaseModel):
     timestamp: datetime
 
 
+class EmptyVisitLocationSchema(BaseModel):
+    """Schema for visit location without geolocation data"""
+
+    id: int
+    is_empty: Literal[True] = True
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class VisitLocationSchema(BaseModel):
     """Schema for visit location"""
 
@@ -96,29 +106,14 @@ class VisitLocationSchema(BaseModel):
     timezone: Optional[str] = None
     lat: Optional[float] = None
     lon: Optional[float] = None
-    is_empty: bool = True
+    is_empty: Literal[False] = False
 
     model_config = ConfigDict(from_attributes=True)
 
-    @model_serializer
-    def custom_serializer(self) -> Dict[str, Any]:
-        if self.is_empty:
-            return {
-                "id": self.id,
-                "is_empty": True,
-            }
-
-        return {
-            "id": self.id,
-            "country_code": self.country_code,
-            "country_name": self.country_name,
-            "region_name": self.region_name,
-            "city_name": self.city_name,
-            "timezone": self.timezone,
-            "lat": self.lat,
-            "lon": self.lon,
-            "is_empty": False,
-        }
+
+# Two plain models instead of a Python model_serializer branching on is_empty,
+# so pydantic-core serializes every location without calling back into Python
+AnyVisitLocationSchema = Union[VisitLocationSchema, EmptyVisitLocationSchema]
 
 
 class VisitWithLocationSchema(BaseModel):
@@ -135,7 +130,7 @@ class VisitWithLocationSchema(BaseModel):
     redirect_url: Optional[str] = None
     short_url_id: Optional[int] = None
     visit_location_id: Optional[int] = None
-    location: Optional[VisitLocationSchema] = None
+    location: Optional[AnyVisitLocationSchema] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -165,7 +160,17 @@ class ShortUrlSyncSchema(BaseModel):
 class SyncResponse(BaseModel):
     """Generic sync response wrapper"""
 
-    total: int
+    total: Optional[int] = Field(
+        None,
+        description=(
+            "Set with include_total=true or when paging by offset without min_id. "
+            "short-urls: rows in the whole table, ignoring min_id (an estimate on "
+            "PostgreSQL, cached for a minute). visits and visit-locations: exact "
+            "count of the rows matching the filters, or the same whole-table "
+            "figure when unfiltered."
+        ),
+    )
     limit: int
     offset: int
+    next_cursor: Optional[int] = None  # Pass back as min_id for the next page
     data: List[Any]
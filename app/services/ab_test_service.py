@@ -3,14 +3,14 @@ Service for A/B test CRUD operations
 """
 
 import logging
-from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import select, func
+from sqlalchemy import case, lambda_stmt, select, func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from app.models import ABTest, ShortUrl
 from app.schemas import ABTestCreate, ABTestUpdate
+from app.services.redirect_cache import redirect_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,21 +18,28 @@ logger = logging.getLogger(__name__)
 class ABTestValidationError(Exception):
     """Raised when A/B test validation fails"""
 
-    pass
+    def __init__(self, message: str, short_url_id: Optional[int] = None):
+        super().__init__(message)
+        # Short URL the failed test belongs to, None if it doesn't exist
+        self.short_url_id = short_url_id
 
 
 class ABTestService:
     """Handles A/B test CRUD operations"""
 
+    __slots__ = ("db",)
+
     def __init__(self, db: Session):
         self.db = db
 
     def get_all_tests(self, short_url_id: int) -> list[ABTest]:
         """Get all A/B tests for a short URL"""
-        query = (
-            select(ABTest)
-            .where(ABTest.short_url_id == short_url_id)
-            .order_by(ABTest.created_at)
+        query = lambda_stmt(
+            lambda: (
+                select(ABTest)
+                .where(ABTest.short_url_id == short_url_id)
+                .order_by(ABTest.created_at)
+            )
         )
         return list(self.db.execute(query).scalars().all())
 
@@ -53,18 +60,50 @@ class ABTestService:
         Returns:
             Total probability (0.0 to 1.0)
         """
-        query = (
-            select(func.sum(ABTest.probability))
-            .where(ABTest.short_url_id == short_url_id)
-            .where(ABTest.is_active.is_(True))
+        # lambda_stmt caches construction and compiled SQL; ids are bound
+        query = lambda_stmt(
+            lambda: (
+                select(func.sum(ABTest.probability))
+                .where(ABTest.short_url_id == short_url_id)
+                .where(ABTest.is_active.is_(True))
+            )
         )
 
         if exclude_test_id:
-            query = query.where(ABTest.id != exclude_test_id)
+            query += lambda s: s.where(ABTest.id != exclude_test_id)
 
-        result = self.db.execute(query).scalar()
+        result = self.db.scalar(query)
         return float(result) if result else 0.0
 
+    def get_test_stats(self, short_url_ids: list[int]) -> dict[int, tuple[int, float]]:
+        """
+        Aggregate test count and active probability per short URL in SQL
+
+        Args:
+            short_url_ids: IDs of the short URLs
+
+        Returns:
+            Mapping of short URL ID to (test count, total active probability);
+            short URLs without tests are omitted
+        """
+        if not short_url_ids:
+            return {}
+
+        query = (
+            select(
+                ABTest.short_url_id,
+                func.count(ABTest.id),
+                func.sum(case((ABTest.is_active, ABTest.probability), else_=0.0)),
+            )
+            .where(ABTest.short_url_id.in_(short_url_ids))
+            .group_by(ABTest.short_url_id)
+        )
+
+        return {
+            short_url_id: (count, float(total or 0.0))
+            for short_url_id, count, total in self.db.execute(query)
+        }
+
     def validate_probability_sum(
         self,
         short_url_id: int,
@@ -83,9 +122,60 @@ class ABTestService:
         if new_total > 1.0:
             raise ABTestValidationError(
                 f"Total probability would be {new_total:.2f} (max 1.0). "
-                f"Current total: {current_total:.2f}, attempting to add: {new_probability:.2f}"
+                f"Current total: {current_total:.2f}, attempting to add: {new_probability:.2f}",
+                short_url_id=short_url_id,
             )
 
+    def lock_short_url(self, short_url_id: int) -> Optional[int]:
+        """
+        Lock a short URL's row until the transaction ends
+
+        Creates and updates validate the probability sum of the short URL's
+        active tests before writing. Holding this lock serializes them per
+        short URL, so two concurrent writes can't both pass the check and
+        push the sum past 1.0. It must be the first statement of the
+        transaction: under MySQL's REPEATABLE READ an earlier plain read
+        would fix the snapshot, and the sum would miss tests committed
+        while waiting for the lock.
+
+        On PostgreSQL this is FOR NO KEY UPDATE (key_share), which still
+        lets Shlink insert visits that reference the row. Other databases
+        take a plain FOR UPDATE, so on MySQL Shlink's visit inserts for this
+        short URL wait (their foreign key check needs a shared lock on the
+        row) until the transaction ends.
+
+        Args:
+            short_url_id: ID of the short URL
+
+        Returns:
+            The short URL ID, or None if it doesn't exist
+        """
+        return self.db.scalar(
+            select(ShortUrl.id)
+            .where(ShortUrl.id == short_url_id)
+            .with_for_update(key_share=True)
+        )
+
+    def lock_short_url_of_test(self, test_id: int) -> Optional[int]:
+        """
+        Lock the short URL owning an A/B test until the transaction ends
+
+        Same lock as lock_short_url, for callers that only know the test
+        (the test's own row is locked too, which the update needs anyway).
+
+        Args:
+            test_id: ID of the A/B test
+
+        Returns:
+            The short URL ID, or None if the test doesn't exist
+        """
+        return self.db.scalar(
+            select(ShortUrl.id)
+            .join(ABTest, ABTest.short_url_id == ShortUrl.id)
+            .where(ABTest.id == test_id)
+            .with_for_update(key_share=True)
+        )
+
     def create_test(self, short_url_id: int, test_data: ABTestCreate) -> ABTest:
         """
         Create a new A/B test
@@ -100,9 +190,8 @@ class ABTestService:
         Raises:
             ABTestValidationError: If validation fails
         """
-        # Verify short URL exists
-        short_url = self.db.get(ShortUrl, short_url_id)
-        if not short_url:
+        # Verify short URL exists and hold it until commit
+        if self.lock_short_url(short_url_id) is None:
             raise ABTestValidationError(f"Short URL {short_url_id} not found")
 
         # Validate probability sum
@@ -115,14 +204,13 @@ class ABTestService:
             target_url=test_data.target_url,
             probability=test_data.probability,
             is_active=test_data.is_active,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
         )
 
         try:
             self.db.add(ab_test)
             self.db.commit()
             self.db.refresh(ab_test)
+            redirect_cache.invalidate(short_url_id)
 
             logger.info(
                 f"Created A/B test {ab_test.id} for short_url_id={short_url_id}"
@@ -131,7 +219,9 @@ class ABTestService:
         except IntegrityError as e:
             self.db.rollback()
             logger.error(f"Failed to create A/B test: {e}")
-            raise ABTestValidationError("Failed to create A/B test") from e
+            raise ABTestValidationError(
+                "Failed to create A/B test", short_url_id=short_url_id
+            ) from e
 
     def update_test(self, test_id: int, test_data: ABTestUpdate) -> ABTest:
         """
@@ -147,7 +237,12 @@ class ABTestService:
         Raises:
             ABTestValidationError: If validation fails or test not found
         """
-        ab_test = self.get_test_by_id(test_id)
+        # Lock first, then read the test as it is once the lock is held
+        ab_test = None
+        short_url_id = self.lock_short_url_of_test(test_id)
+        if short_url_id is not None:
+            ab_test = self.db.get(ABTest, test_id, populate_existing=True)
+
         if not ab_test:
             raise ABTestValidationError(f"A/B test {test_id} not found")
 
@@ -180,18 +275,21 @@ class ABTestService:
                 )
             ab_test.is_active = test_data.is_active
 
-        ab_test.updated_at = datetime.now(timezone.utc)
+        # updated_at is set by the database (onupdate=func.now())
 
         try:
             self.db.commit()
             self.db.refresh(ab_test)
+            redirect_cache.invalidate(ab_test.short_url_id)
 
             logger.info(f"Updated A/B test {test_id}")
             return ab_test
         except IntegrityError as e:
             self.db.rollback()
             logger.error(f"Failed to update A/B test: {e}")
-            raise ABTestValidationError("Failed to update A/B test") from e
+            raise ABTestValidationError(
+                "Failed to update A/B test", short_url_id=short_url_id
+            ) from e
 
     def delete_test(self, test_id: int) -> bool:
         """
@@ -209,6 +307,7 @@ class ABTestService:
 
         self.db.delete(ab_test)
         self.db.commit()
+        redirect_cache.invalidate(ab_test.short_url_id)
 
         logger.info(f"Deleted A/B test {test_id}")
         return True
@@ -2,16 +2,15 @@
 JWT-based Authentication service for admin access
 """
 
+import heapq
 import secrets
-from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Tuple
 
 import jwt  # PyJWT
 from jwt import InvalidTokenError, ExpiredSignatureError
 
-from app.config import get_settings
-
-settings = get_settings()
+from app.config import settings
 
 
 class AuthService:
@@ -21,7 +20,10 @@ class AuthService:
     - create_session() issues a JWT (stateless).
     - verify_session() verifies signature, expiration and revocation state.
     - invalidate_session() marks a token's jti as revoked (in-memory blacklist).
-    - cleanup_revoked_tokens() removes expired entries from the blacklist.
+    - cleanup_revoked_tokens() removes expired entries from the blacklist;
+      invalidate_session() also does this as it goes.
+    - Successful verifications are cached for VERIFY_CACHE_TTL seconds, so
+      repeated admin requests skip JWT decoding.
 
     Security notes:
     - Use a strong settings.jwt_secret and rotate it periodically.
@@ -31,6 +33,17 @@ class AuthService:
     # In-memory revoked-token store: jti -> expiry timestamp (int)
     _revoked_tokens: Dict[str, int] = {}
 
+    # Min-heap of (expiry, jti) so expired revocations pop off in order
+    _revoked_heap: List[Tuple[int, str]] = []
+
+    # Recently verified tokens: token -> timestamp until which it is trusted
+    _verified_tokens: Dict[str, int] = {}
+    VERIFY_CACHE_TTL = 30
+    VERIFY_CACHE_MAX_SIZE = 1024
+
+    # Admin token encoded once; bytes also compare safely when non-ASCII
+    _ADMIN_TOKEN_BYTES = settings.admin_token.encode()
+
     @staticmethod
     def verify_admin_token(token: str) -> bool:
         """
@@ -42,12 +55,12 @@ class AuthService:
         Returns:
             True if valid
         """
-        return secrets.compare_digest(token, settings.admin_token)
+        return secrets.compare_digest(token.encode(), AuthService._ADMIN_TOKEN_BYTES)
 
     @staticmethod
     def _now_ts() -> int:
         """Return current time as unix timestamp (int)."""
-        return int(datetime.now(timezone.utc).timestamp())
+        return int(time.time())
 
     @staticmethod
     def create_session() -> str:
@@ -110,6 +123,17 @@ class AuthService:
 
         return payload
 
+    @staticmethod
+    def _purge_verified_tokens(now: int) -> None:
+        """Drop verification cache entries that are no longer trusted"""
+        stale = [
+            token
+            for token, trusted_until in AuthService._verified_tokens.items()
+            if trusted_until <= now
+        ]
+        for token in stale:
+            del AuthService._verified_tokens[token]
+
     @staticmethod
     def verify_session(session_token: Optional[str]) -> bool:
         """
@@ -124,8 +148,29 @@ class AuthService:
         if not session_token:
             return False
 
+        now = AuthService._now_ts()
+        trusted_until = AuthService._verified_tokens.get(session_token)
+        if trusted_until is not None and now < trusted_until:
+            return True
+
         payload = AuthService.decode_session(session_token)
-        return payload is not None
+        if payload is None:
+            AuthService._verified_tokens.pop(session_token, None)
+            return False
+
+        if len(AuthService._verified_tokens) >= AuthService.VERIFY_CACHE_MAX_SIZE:
+            AuthService._purge_verified_tokens(now)
+
+        # Still full: evict the oldest entry (dicts keep insertion order)
+        if len(AuthService._verified_tokens) >= AuthService.VERIFY_CACHE_MAX_SIZE:
+            oldest = next(iter(AuthService._verified_tokens))
+            del AuthService._verified_tokens[oldest]
+
+        # Never trust a token past its own expiry
+        AuthService._verified_tokens[session_token] = min(
+            now + AuthService.VERIFY_CACHE_TTL, int(payload["exp"])
+        )
+        return True
 
     @staticmethod
     def invalidate_session(session_token: str) -> None:
@@ -137,6 +182,8 @@ class AuthService:
         Args:
             session_token: JWT token to revoke
         """
+        AuthService._verified_tokens.pop(session_token, None)
+
         try:
             # We only need to decode the token WITHOUT verifying expiration, to learn the jti and exp.
             payload = jwt.decode(
@@ -156,6 +203,10 @@ class AuthService:
 
         # store expiry as int timestamp
         AuthService._revoked_tokens[jti] = int(exp)
+        heapq.heappush(AuthService._revoked_heap, (int(exp), jti))
+
+        # Keep the blacklist bounded without a separate cleanup call
+        AuthService.cleanup_revoked_tokens()
 
     @staticmethod
     def _is_revoked(jti: str) -> bool:
@@ -186,11 +237,14 @@ class AuthService:
             Number of entries removed
         """
         now = AuthService._now_ts()
-        to_remove = [
-            jti for jti, exp in AuthService._revoked_tokens.items() if exp <= now
-        ]
+        heap = AuthService._revoked_heap
+        removed = 0
 
-        for jti in to_remove:
-            del AuthService._revoked_tokens[jti]
+        # Only expired entries are visited: O(k log n) rather than a full scan
+        while heap and heap[0][0] <= now:
+            _, jti = heapq.heappop(heap)
+            # _is_revoked may already have dropped it
+            if AuthService._revoked_tokens.pop(jti, None) is not None:
+                removed += 1
 
-        return len(to_remove)
+        return removed
@@ -3,18 +3,39 @@ Google Forms field mapping service with caching
 """
 
 import logging
-from datetime import datetime, timezone
-from typing import Any, List, Optional, Dict, Set
-from sqlalchemy import delete, select
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Dict, Set, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from app.config import get_settings
+from app.config import settings
 from app.models.form_entry import FormEntry
 from app.models.google_form import GoogleForm
 
 logger = logging.getLogger(__name__)
 
+DELETE_BATCH_SIZE = 10000
+
+# Forms fetched per App Script request, and App Script requests run at once
+FETCH_BATCH_SIZE = 20
+FETCH_CONCURRENCY = 10
+
+# (connect, read) timeouts in seconds for App Script requests
+REQUEST_TIMEOUT = (5, 60)
+
+# Prefill parameters of connected forms, per worker process:
+# responder form ID -> (expiry monotonic time, (edit form ID, parameters)).
+# Only connected forms are cached, so the size is bounded by google_forms.
+_prefill_cache: Dict[str, Tuple[float, Tuple[str, Dict[str, str]]]] = {}
+
 
 class GoogleFormsFieldMapper:
     """
@@ -48,12 +69,29 @@ class GoogleFormsFieldMapper:
         self.app_script_api_token = app_script_api_token
         self.fields_to_cache = fields_to_cache
 
+        # Keep-alive connections shared by every request (and the bulk
+        # fetch threads), so only the first call pays for the TLS handshake
+        self._session = requests.Session()
+        self._session.headers["Accept"] = "application/json"
+        self._session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_maxsize=FETCH_CONCURRENCY,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.2,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                ),
+            ),
+        )
+
     def get_form(self, form_id: str) -> Optional[Dict[str, Any]]:
-        headers = {"Accept": "application/json"}
         params = {"formId": form_id, "token": self.app_script_api_token}
 
         try:
-            response = requests.get(self.app_script_url, params=params, headers=headers)
+            response = self._session.get(
+                self.app_script_url, params=params, timeout=REQUEST_TIMEOUT
+            )
             response.raise_for_status()
 
             data: Dict[str, Any] = response.json()
@@ -69,38 +107,148 @@ class GoogleFormsFieldMapper:
 
             return None
 
-    @staticmethod
-    def get_form_entries(db: Session, form_id: str) -> List[FormEntry]:
-        entries_q = (
-            select(FormEntry).join(GoogleForm).where(GoogleForm.form_id == form_id)
-        )
-        entries_res = db.execute(entries_q)
-        entries_list = list(entries_res.scalars().all())
+    def get_forms(
+        self, form_ids: List[str]
+    ) -> Optional[Dict[str, Optional[Dict[str, Any]]]]:
+        """
+        Fetch several forms with a single App Script request
+
+        Args:
+            form_ids: Google Forms edit IDs
+
+        Returns:
+            Form data by form ID (None for forms that could not be read), or
+            None if the request failed or the deployed script has no batch support
+        """
+        params = {"formIds": ",".join(form_ids), "token": self.app_script_api_token}
+
+        try:
+            response = self._session.get(
+                self.app_script_url, params=params, timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+
+            data: Dict[str, Any] = response.json()
+            status_code = data["status"]
+            if status_code != 200:
+                raise Exception(
+                    f"Request error {status_code}: {data.get("error", "Unknown error")}"
+                )
+
+            forms: Dict[str, Dict[str, Any]] = data["forms"]
+        except Exception as e:
+            logger.error(e)
+
+            return None
+
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for form_id in form_ids:
+            form = forms.get(form_id)
+            if form and form.get("status") == 200:
+                results[form_id] = form
+            else:
+                logger.error(f"Unable to fetch form {form_id}: {form}")
+                results[form_id] = None
+
+        return results
+
+    def get_forms_bulk(
+        self, form_ids: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch many forms in FETCH_BATCH_SIZE batches, several batches at a time
+
+        Batches the App Script cannot serve in one request (e.g. deployments
+        older than batch support) fall back to one request per form.
+
+        Args:
+            form_ids: Google Forms edit IDs
+
+        Returns:
+            Form data by form ID (None for forms that could not be read)
+        """
+        batches = [
+            form_ids[i : i + FETCH_BATCH_SIZE]
+            for i in range(0, len(form_ids), FETCH_BATCH_SIZE)
+        ]
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+
+        with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+            for batch, fetched in zip(batches, executor.map(self.get_forms, batches)):
+                if fetched is None:
+                    fetched = dict(zip(batch, executor.map(self.get_form, batch)))
+
+                results.update(fetched)
 
-        return entries_list
+        return results
 
     @staticmethod
-    def get_field_to_entry_mappings(db: Session, form_id: str) -> Dict[str, int]:
-        entries_list = GoogleFormsFieldMapper.get_form_entries(db, form_id)
-        mappings: Dict[str, int] = {}
-        for entry in entries_list:
-            mappings[entry.title] = entry.entry_id
+    def get_prefill_params_by_responder_id(
+        db: Session, responder_form_id: str
+    ) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        Look up a connected form and its prefill parameters in one query
+
+        Args:
+            db: Database session
+            responder_form_id: Responder form ID taken from a form URL
 
-        return mappings
+        Returns:
+            Tuple of (edit form ID, field title to prefill parameter name such
+            as "entry.123"), or None if the form is not connected
+        """
+        now = time.monotonic()
+        cached = _prefill_cache.get(responder_form_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        rows = db.execute(
+            select(GoogleForm.form_id, FormEntry.title, FormEntry.entry_id)
+            .select_from(GoogleForm)
+            .outerjoin(FormEntry)
+            .where(GoogleForm.responder_form_id == responder_form_id)
+        ).all()
+        if not rows:
+            return None
+
+        prefill_params = {
+            title: f"entry.{entry_id}"
+            for _, title, entry_id in rows
+            if title is not None
+        }
+
+        result = (rows[0].form_id, prefill_params)
+        if settings.form_cache_ttl > 0:
+            _prefill_cache[responder_form_id] = (now + settings.form_cache_ttl, result)
+
+        return result
+
+    @staticmethod
+    def clear_prefill_cache() -> None:
+        """Drop cached prefill parameters after forms or their entries change"""
+        _prefill_cache.clear()
 
     def update_mapping(self, db: Session, form_id: str, data: Dict[str, Any]) -> None:
-        saved_entries_list = self.get_form_entries(db, form_id)
-        saved_entries: Dict[str, FormEntry] = {}
-        for entry in saved_entries_list:
-            saved_entries[entry.title] = entry
+        # One query for the form ID and its saved entries (none for a new form)
+        rows = db.execute(
+            select(GoogleForm.id, FormEntry.id, FormEntry.title, FormEntry.entry_id)
+            .select_from(GoogleForm)
+            .outerjoin(FormEntry)
+            .where(GoogleForm.form_id == form_id)
+        ).all()
+        if not rows:
+            raise NoResultFound(f"Google Form {form_id} not found")
 
-        if len(saved_entries_list):
-            google_form_id = saved_entries_list[0].google_form_id
-        else:
-            form_id_q = select(GoogleForm.id).where(GoogleForm.form_id == form_id)
-            form_id_res = db.execute(form_id_q)
-            google_form_id = form_id_res.scalar_one()
+        google_form_id = rows[0][0]
+        # title -> (FormEntry.id, entry_id)
+        saved_entries: Dict[str, Tuple[int, int]] = {
+            title: (entry_pk, entry_id)
+            for _, entry_pk, title, entry_id in rows
+            if entry_pk is not None
+        }
 
+        new_entries: List[Dict[str, Any]] = []
+        changed_entries: List[Dict[str, Any]] = []
         mapping = data["mapping"]
         for entry in mapping:
             title = entry["title"]
@@ -108,23 +256,121 @@ class GoogleFormsFieldMapper:
                 entry_id = entry["entryId"]
                 saved_entry = saved_entries.pop(title, None)
                 if saved_entry:
-                    if saved_entry.entry_id != entry_id:
-                        saved_entry.entry_id = entry_id
-                        saved_entry.updated_at = datetime.now(timezone.utc)
+                    if saved_entry[1] != entry_id:
+                        changed_entries.append(
+                            {"id": saved_entry[0], "entry_id": entry_id}
+                        )
                 else:
-                    new_entry = FormEntry(
-                        title=title, entry_id=entry_id, google_form_id=google_form_id
+                    new_entries.append(
+                        {
+                            "title": title,
+                            "entry_id": entry_id,
+                            "google_form_id": google_form_id,
+                        }
                     )
-                    db.add(new_entry)
+
+        if changed_entries:
+            # Bulk UPDATE by primary key; updated_at is set by the database
+            db.execute(update(FormEntry), changed_entries)
+
+        if new_entries:
+            # Single executemany INSERT instead of one unit-of-work add per entry
+            db.execute(insert(FormEntry), new_entries)
 
         if saved_entries:
             db.execute(
                 delete(FormEntry).where(
-                    FormEntry.id.in_([c.id for c in saved_entries.values()])
+                    FormEntry.id.in_([pk for pk, _ in saved_entries.values()])
                 )
             )
 
         db.commit()
+        self.clear_prefill_cache()
+
+    @staticmethod
+    def upsert_form(
+        db: Session, form_id: str, responder_form_id: str, title: str
+    ) -> None:
+        """
+        Insert a Google Form or update it if form_id is already stored
+
+        Uses a single INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE
+        statement where the dialect supports it, so there is no SELECT first
+        and no race between concurrent inserts.
+
+        Args:
+            db: Database session
+            form_id: Google Forms edit ID
+            responder_form_id: Google Forms responder ID
+            title: Form title
+        """
+        values = {
+            "form_id": form_id,
+            "responder_form_id": responder_form_id,
+            "title": title,
+        }
+        dialect = db.get_bind().dialect.name
+
+        if dialect == "mysql":
+            mysql_stmt = mysql_insert(GoogleForm).values(**values)
+            db.execute(
+                mysql_stmt.on_duplicate_key_update(
+                    responder_form_id=mysql_stmt.inserted.responder_form_id,
+                    title=mysql_stmt.inserted.title,
+                    updated_at=func.now(),
+                )
+            )
+        elif dialect in ("postgresql", "sqlite"):
+            insert_fn = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            stmt = insert_fn(GoogleForm).values(**values)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[GoogleForm.form_id],
+                    set_={
+                        "responder_form_id": stmt.excluded.responder_form_id,
+                        "title": stmt.excluded.title,
+                        "updated_at": func.now(),
+                    },
+                )
+            )
+        else:
+            google_form = db.execute(
+                select(GoogleForm).where(GoogleForm.form_id == form_id)
+            ).scalar_one_or_none()
+            if google_form:
+                google_form.responder_form_id = responder_form_id
+                google_form.title = title
+            else:
+                db.add(GoogleForm(**values))
+
+        db.commit()
+        GoogleFormsFieldMapper.clear_prefill_cache()
+
+    @staticmethod
+    def delete_form(db: Session, google_form_id: int) -> None:
+        """
+        Delete a Google Form together with its entries
+
+        Entries are deleted in batches before the form itself (the foreign key
+        restricts deletes instead of cascading). Batching only applies on
+        MySQL; other dialects ignore the limit and delete all entries at once.
+
+        Args:
+            db: Database session
+            google_form_id: Database ID of Google Form
+        """
+        delete_entries = (
+            delete(FormEntry)
+            .where(FormEntry.google_form_id == google_form_id)
+            .with_dialect_options(mysql_limit=DELETE_BATCH_SIZE)
+        )
+        connection = db.connection()
+        while connection.execute(delete_entries).rowcount:
+            pass
+
+        connection.execute(delete(GoogleForm).where(GoogleForm.id == google_form_id))
+        db.commit()
+        GoogleFormsFieldMapper.clear_prefill_cache()
 
 
 # Global instance (singleton pattern)
@@ -140,7 +386,6 @@ def get_forms_mapper() -> GoogleFormsFieldMapper:
     """
     global _forms_mapper
     if _forms_mapper is None:
-        settings = get_settings()
         _forms_mapper = GoogleFormsFieldMapper(
             settings.app_script_url, settings.app_script_api_key
         )
@@ -0,0 +1,112 @@
+"""
+In-process cache of resolved redirect targets
+"""
+
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Protocol, Tuple
+
+from app.config import settings
+
+
+class ABVariant(Protocol):
+    """Anything select_ab_variant can pick from (ABTest or CachedABTest)"""
+
+    @property
+    def id(self) -> int: ...
+
+    @property
+    def target_url(self) -> str: ...
+
+    @property
+    def probability(self) -> float: ...
+
+
+class CachedABTest(NamedTuple):
+    """Snapshot of an active A/B test"""
+
+    id: int
+    target_url: str
+    probability: float
+
+
+class RedirectTarget(NamedTuple):
+    """Snapshot of a resolved short URL with its active A/B tests"""
+
+    short_url_id: int
+    short_code: str
+    redirect_url: Optional[str]
+    ab_tests: Tuple[CachedABTest, ...]
+    # Running sum of ab_tests probabilities, for bisecting in select_ab_variant
+    cumulative_probabilities: Tuple[float, ...]
+
+
+class RedirectCache:
+    """
+    TTL cache of RedirectTarget keyed by (url, domain_id)
+
+    Entries hold plain snapshots rather than ORM objects, so they are safe to
+    share between request threads and sessions. Only found URLs are cached,
+    so unknown URLs cannot grow the cache and new short URLs appear at once.
+    A/B test changes invalidate the entry in this process; other workers pick
+    them up when their entry expires.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[
+            Tuple[str, Optional[int]], Tuple[float, RedirectTarget]
+        ] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, domain_id: Optional[int]) -> Optional[RedirectTarget]:
+        """Return the cached target for url, or None if missing or expired"""
+        cached = self._entries.get((url, domain_id))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        return None
+
+    def set(self, url: str, domain_id: Optional[int], target: RedirectTarget) -> None:
+        """Cache target for url for ttl seconds"""
+        if self.ttl <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            # Re-inserting moves the key to the end, so with a fixed ttl the
+            # dict stays ordered by expiry and expired entries sit at the front
+            self._entries.pop((url, domain_id), None)
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if self._entries[oldest][0] > now:
+                    break
+                del self._entries[oldest]
+
+            # Still full: evict the entry closest to expiry
+            if len(self._entries) >= self.max_size:
+                del self._entries[next(iter(self._entries))]
+
+            self._entries[(url, domain_id)] = (now + self.ttl, target)
+
+    def invalidate(self, short_url_id: int) -> None:
+        """Drop every entry resolving to short_url_id"""
+        with self._lock:
+            stale = [
+                key
+                for key, (_, target) in self._entries.items()
+                if target.short_url_id == short_url_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+redirect_cache = RedirectCache(
+    ttl=settings.redirect_cache_ttl, max_size=settings.redirect_cache_max_size
+)
@@ -4,23 +4,60 @@ Service for handling URL redirects and A/B testing
 
 import hashlib
 import logging
-from typing import Optional, Tuple
-from sqlalchemy import select, desc
-from sqlalchemy.orm import Session
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import StatementLambdaElement, and_, lambda_stmt, select, desc
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.orm import Session, raiseload
 
 from app.models import ShortUrl, Visit, ABTest
-from app.config import get_settings
+from app.config import APP_URL_PREFIX
+from app.services.redirect_cache import (
+    ABVariant,
+    CachedABTest,
+    RedirectTarget,
+    redirect_cache,
+)
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
+
+# Number of distinct bucket values from the first 4 bytes of the IP hash
+HASH_RANGE = 2**32
 
 
 class RedirectService:
     """Handles redirect logic and A/B testing"""
 
+    __slots__ = ("db",)
+
     def __init__(self, db: Session):
         self.db = db
 
+    @staticmethod
+    def _filter_by_url(
+        stmt: StatementLambdaElement, url: str, domain_id: Optional[int]
+    ) -> StatementLambdaElement:
+        """
+        Restrict a ShortUrl lambda statement to the one handled by this app
+
+        Statements are built with lambda_stmt, so SQLAlchemy caches their
+        construction and compiled SQL per call site; url and domain_id are
+        extracted as bound parameters. Each lambda must keep a fixed
+        structure, hence one lambda per domain_id branch.
+        """
+        stmt += lambda s: s.where(
+            ShortUrl.original_url.startswith(APP_URL_PREFIX),
+            ShortUrl.original_url.icontains(url),
+        )
+
+        if domain_id is not None:
+            stmt += lambda s: s.where(ShortUrl.domain_id == domain_id)
+        else:
+            stmt += lambda s: s.where(ShortUrl.domain_id.is_(None))
+
+        return stmt
+
     def resolve_url(
         self, url: str, domain_id: Optional[int] = None
     ) -> Optional[ShortUrl]:
@@ -34,20 +71,9 @@ class RedirectService:
         Returns:
             ShortUrl object or None if not found
         """
-
-        settings = get_settings()
-        app_url = str(settings.app_url).rstrip("/")
-
-        query = select(ShortUrl).where(
-            ShortUrl.original_url.startswith(app_url),
-            ShortUrl.original_url.icontains(url),
+        query = self._filter_by_url(
+            lambda_stmt(lambda: select(ShortUrl)), url, domain_id
         )
-
-        if domain_id is not None:
-            query = query.where(ShortUrl.domain_id == domain_id)
-        else:
-            query = query.where(ShortUrl.domain_id.is_(None))
-
         result = self.db.execute(query).scalar_one_or_none()
 
         if result:
@@ -96,36 +122,104 @@ class RedirectService:
         Returns:
             Visit object or None if no visits exist
         """
-        query = (
-            select(Visit)
-            .where(Visit.short_url_id == short_url_id)
-            .order_by(desc(Visit.date))
-            .limit(1)
+        query = lambda_stmt(
+            lambda: (
+                select(Visit)
+                .where(Visit.short_url_id == short_url_id)
+                .order_by(desc(Visit.date))
+                .limit(1)
+                .options(raiseload("*"))
+            )
         )
 
         return self.db.execute(query).scalar_one_or_none()
 
-    def get_active_ab_tests(self, short_url_id: int) -> list[ABTest]:
+    def resolve_for_redirect(
+        self, url: str, domain_id: Optional[int] = None
+    ) -> Tuple[Optional[RedirectTarget], Optional[Visit]]:
         """
-        Get all active A/B tests for a short URL
+        Resolve original url with its active A/B tests and last visit
+
+        Resolved targets are cached in-process, so a cache hit only has to
+        fetch the last visit. On a miss everything is fetched in a single
+        round-trip: one row per active A/B test (or one row if there are
+        none), each carrying the short URL and its most recent visit.
+        Relationships are set to raise on access so a lazy load can't sneak
+        back into the hot path.
 
         Args:
-            short_url_id: ID of the short URL
+            url: The original url to resolve
+            domain_id: Optional domain ID for multi-domain support
 
         Returns:
-            List of active ABTest objects
+            Tuple of (RedirectTarget or None, last Visit or None)
+
+        Raises:
+            MultipleResultsFound: If url matches more than one short URL
         """
-        query = (
-            select(ABTest)
-            .where(ABTest.short_url_id == short_url_id)
-            .where(ABTest.is_active.is_(True))
-            .order_by(ABTest.id)
+        target = redirect_cache.get(url, domain_id)
+        if target is not None:
+            return target, self.get_last_visit(target.short_url_id)
+
+        query = lambda_stmt(
+            lambda: (
+                select(ShortUrl, ABTest, Visit)
+                .outerjoin(
+                    ABTest,
+                    and_(
+                        ABTest.short_url_id == ShortUrl.id, ABTest.is_active.is_(True)
+                    ),
+                )
+                .outerjoin(
+                    Visit,
+                    Visit.id
+                    == select(Visit.id)
+                    .where(Visit.short_url_id == ShortUrl.id)
+                    .order_by(desc(Visit.date))
+                    .limit(1)
+                    .correlate(ShortUrl)
+                    .scalar_subquery(),
+                )
+                .order_by(ABTest.id)
+                .options(raiseload("*"))
+            )
+        )
+        query = self._filter_by_url(query, url, domain_id)
+        rows = self.db.execute(query).all()
+
+        if not rows:
+            logger.warning(f"URL not found for: {url}")
+            return None, None
+
+        short_url, _, last_visit = rows[0]
+        if any(row[0] is not short_url for row in rows):
+            raise MultipleResultsFound(f"Multiple short URLs match url={url}")
+
+        logger.info(f"Resolved url={url} to short_url_id={short_url.id}")
+        ab_tests = tuple(
+            CachedABTest(test.id, test.target_url, test.probability)
+            for _, test, _ in rows
+            if test is not None
+        )
+        target = RedirectTarget(
+            short_url_id=short_url.id,
+            short_code=short_url.short_code,
+            redirect_url=short_url.redirect_url,
+            ab_tests=ab_tests,
+            cumulative_probabilities=tuple(
+                accumulate(test.probability for test in ab_tests)
+            ),
         )
+        redirect_cache.set(url, domain_id, target)
 
-        return list(self.db.execute(query).scalars().all())
+        return target, last_visit
 
     def select_ab_variant(
-        self, ip_address: str, ab_tests: list[ABTest], primary_url: str
+        self,
+        ip_address: str,
+        ab_tests: Sequence[ABVariant],
+        primary_url: str,
+        cumulative_probabilities: Optional[Sequence[float]] = None,
     ) -> Tuple[str, Optional[int]]:
         """
         Deterministically select A/B test variant based on IP hash
@@ -134,6 +228,8 @@ class RedirectService:
             ip_address: User's IP address
             ab_tests: List of active A/B tests
             primary_url: Primary URL (fallback)
+            cumulative_probabilities: Running sum of ab_tests probabilities,
+                computed here when not precomputed (see RedirectTarget)
 
         Returns:
             Tuple of (target_url, ab_test_id or None)
@@ -141,18 +237,32 @@ class RedirectService:
         if not ab_tests:
             return primary_url, None
 
-        # Create deterministic hash from IP
-        to_hash = primary_url + ip_address
-        hash_value = hashlib.md5(to_hash.encode()).hexdigest()
-        hash_float = int(hash_value[:8], 16) / (16**8)
-
-        # Select variant based on probability ranges
-        cumulative_prob = 0.0
-        for test in ab_tests:
-            cumulative_prob += test.probability
-            if hash_float < cumulative_prob:
-                logger.info(f"Selected A/B test {test.id} for IP hash {hash_float:.4f}")
-                return test.target_url, test.id
+        # The first variant covers the whole [0, 1) hash range, so every
+        # visitor gets it and there is nothing to hash
+        if ab_tests[0].probability >= 1.0:
+            test = ab_tests[0]
+            logger.info(f"Selected A/B test {test.id} (probability 1.0)")
+            return test.target_url, test.id
+
+        # Create deterministic hash from IP. MD5 is kept so visitors stay in
+        # their bucket across deploys; reading the first 4 digest bytes gives
+        # the same value as parsing 8 hex digits without hex encoding.
+        # Both parts are fed separately instead of concatenating them first
+        ip_hash = hashlib.md5(primary_url.encode(), usedforsecurity=False)
+        ip_hash.update(ip_address.encode())
+        hash_float = int.from_bytes(ip_hash.digest()[:4]) / HASH_RANGE
+
+        # Select the first variant whose probability range ends past the hash
+        if cumulative_probabilities is None:
+            cumulative_probabilities = tuple(
+                accumulate(test.probability for test in ab_tests)
+            )
+
+        index = bisect_right(cumulative_probabilities, hash_float)
+        if index < len(ab_tests):
+            test = ab_tests[index]
+            logger.info(f"Selected A/B test {test.id} for IP hash {hash_float:.4f}")
+            return test.target_url, test.id
 
         # If no test selected (remaining probability goes to primary)
         logger.info(f"Selected primary URL for IP hash {hash_float:.4f}")
@@ -1,18 +1,26 @@
-from datetime import datetime, timedelta, timezone
+from datetime import timezone
+from functools import lru_cache
 import logging
 import re
-from typing import Any, Dict, Optional
-from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
-from sqlalchemy import select
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode
 from sqlalchemy.orm import Session
 
 from app.services.google_forms import GoogleFormsFieldMapper
-from app.config import get_settings
+from app.config import settings
 from app.models.visit import Visit
-from app.models.google_form import GoogleForm
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
+
+# Query parameters copied into matching Google Forms fields
+UTM_FIELDS = ("utm_source", "utm_medium", "utm_campaign")
+
+# Google Forms URLs, matched by prefix instead of scanning the whole URL
+FORMS_URL_PREFIXES = ("https://docs.google.com/forms", "http://docs.google.com/forms")
+
+# Form ID in responder (/d/e/<id>) and edit (/d/<id>) Google Forms URLs
+FORM_ID_RE = re.compile(r"/d/(?:e/)?([a-zA-Z0-9_-]+)")
 
 
 class UrlBuilder:
@@ -40,34 +48,42 @@ class UrlBuilder:
         Returns:
             Final redirect URL
         """
-        parsed = urlparse(target_url)
-
-        # Start with existing query params from target URL
-        existing_params = parse_qs(parsed.query)
-        final_params = {k: v[0] for k, v in existing_params.items()}
+        is_form = include_form_params and target_url.startswith(FORMS_URL_PREFIXES)
+
+        # Nothing to add or rewrite: skip parsing and re-encoding the URL
+        if (
+            not is_form
+            and not (forward_query and query_params)
+            and "?" not in target_url
+        ):
+            return target_url
+
+        # Split like urlsplit: fragment first, then query. Only the query
+        # is rewritten, so the rest is kept as is
+        url, _, fragment = target_url.partition("#")
+        base, _, query = url.partition("?")
+
+        # Start with existing query params from target URL (first value wins)
+        final_params: Dict[str, str] = {}
+        for key, value in parse_qsl(query):
+            final_params.setdefault(key, value)
 
         # Add forwarded query params if enabled
         if forward_query and query_params:
             final_params.update(query_params)
 
         # Handle Google Forms prefilling
-        if include_form_params and "docs.google.com/forms" in target_url and db:
-            final_params = UrlBuilder._add_google_forms_params(
+        if is_form and db:
+            UrlBuilder._add_google_forms_params(
                 target_url, final_params, query_params, last_visit, db
             )
 
         # Rebuild URL with new query params
-        new_query = urlencode(final_params)
-        redirect_url = urlunparse(
-            (
-                parsed.scheme,
-                parsed.netloc,
-                parsed.path,
-                parsed.params,
-                new_query,
-                parsed.fragment,
-            )
-        )
+        redirect_url = base
+        if final_params:
+            redirect_url += "?" + urlencode(final_params)
+        if fragment:
+            redirect_url += "#" + fragment
 
         return redirect_url
 
@@ -78,19 +94,16 @@ class UrlBuilder:
         query_params: Dict[str, str],
         last_visit: Optional[Visit],
         db: Session,
-    ) -> Dict[str, Any]:
+    ) -> None:
         """
-        Add Google Forms prefill parameters using API
+        Add Google Forms prefill parameters to params in place
 
         Args:
             target_url: Target Google Forms URL
-            params: Existing URL parameters
+            params: Existing URL parameters, updated with entry IDs
             query_params: Query parameters from request
             last_visit: Last visit record
             db: Database session
-
-        Returns:
-            Updated parameters dict with Google Forms entry IDs
         """
 
         try:
@@ -98,73 +111,53 @@ class UrlBuilder:
             responder_form_id = UrlBuilder.extract_form_id(target_url)
             if not responder_form_id:
                 logger.warning("Could not extract responder form ID from URL")
-                return params
+                return
 
-            # Look up edit form ID in database
-            google_form = db.execute(
-                select(GoogleForm).where(
-                    GoogleForm.responder_form_id == responder_form_id
-                )
-            ).scalar_one_or_none()
+            # Look up edit form ID and prefill parameters in one round-trip
+            connected = GoogleFormsFieldMapper.get_prefill_params_by_responder_id(
+                db, responder_form_id
+            )
 
-            if not google_form:
+            if not connected:
                 logger.warning(
                     f"⚠️  Google Form not connected: {responder_form_id}. "
                     f"Add this form in admin dashboard to enable auto-filling."
                 )
-                return params
-
-            # Use edit form ID for API calls
-            form_id = google_form.form_id
-            logger.info(
-                f"Using edit form ID {form_id} for responder form {responder_form_id}"
+                return
+
+            form_id, prefill_params = connected
+            # Per-redirect details are debug-only and formatted lazily
+            logger.debug(
+                "Using edit form ID %s for responder form %s",
+                form_id,
+                responder_form_id,
             )
 
-            entries = GoogleFormsFieldMapper.get_field_to_entry_mappings(db, form_id)
-            if "utm_source" in query_params:
-                entry_id = entries.get("utm_source")
-                if entry_id:
-                    params[f"entry.{entry_id}"] = query_params["utm_source"]
-                    logger.info(f"Mapped utm_source to {entry_id}")
-
-                del query_params["utm_source"]
+            for field in UTM_FIELDS:
+                value = query_params.get(field)
+                if value is None:
+                    continue
 
-            # Map utm_medium if present
-            if "utm_medium" in query_params:
-                entry_id = entries.get("utm_medium")
-                if entry_id:
-                    params[f"entry.{entry_id}"] = query_params["utm_medium"]
-                    logger.info(f"Mapped utm_medium to {entry_id}")
-
-                del query_params["utm_medium"]
-
-            # Map utm_campaign if present
-            if "utm_campaign" in query_params:
-                entry_id = entries.get("utm_campaign")
-                if entry_id:
-                    params[f"entry.{entry_id}"] = query_params["utm_campaign"]
-                    logger.info(f"Mapped utm_campaign to {entry_id}")
-
-                del query_params["utm_campaign"]
+                param = prefill_params.get(field)
+                if param:
+                    params[param] = value
+                    logger.debug("Mapped %s to %s", field, param)
 
             # Map click_id if appropriate
             if last_visit and UrlBuilder.should_include_click_id(last_visit):
-                entry_id = entries.get("click_id")
-                if entry_id:
-                    params[f"entry.{entry_id}"] = str(last_visit.id)
-                    logger.info(f"Mapped click_id to {entry_id}")
-
-                time_entry_id = entries.get("click_timestamp")
-                if time_entry_id:
-                    params[f"entry.{time_entry_id}"] = str(last_visit.date)
-                    logger.info(f"Mapped click_timestamp to {time_entry_id}")
+                param = prefill_params.get("click_id")
+                if param:
+                    params[param] = str(last_visit.id)
+                    logger.debug("Mapped click_id to %s", param)
 
-            return params
+                time_param = prefill_params.get("click_timestamp")
+                if time_param:
+                    params[time_param] = last_visit.date.isoformat(" ")
+                    logger.debug("Mapped click_timestamp to %s", time_param)
 
         except Exception as e:
+            # Prefilling is best effort: redirect without it on error
             logger.error(f"Error adding Google Forms params: {e}")
-            # Return params unchanged on error
-            return params
 
     @staticmethod
     def extract_form_id(url: str) -> Optional[str]:
@@ -177,25 +170,11 @@ class UrlBuilder:
         Returns:
             Form ID or None
         """
-        try:
-            if not url:
-                return None
-
-            patterns = [
-                r"/d/e/([a-zA-Z0-9_-]+)",
-                r"/d/([a-zA-Z0-9_-]+)",
-            ]
-
-            for pattern in patterns:
-                match = re.search(pattern, url)
-                if match:
-                    return match.group(1)
-
+        if not url:
             return None
 
-        except Exception as e:
-            logger.error(f"Error extracting form ID from URL: {e}")
-            return None
+        match = FORM_ID_RE.search(url)
+        return match.group(1) if match else None
 
     @staticmethod
     def should_include_click_id(last_visit: Visit) -> bool:
@@ -214,35 +193,40 @@ class UrlBuilder:
         else:
             last_visit_date = last_visit.date
 
-        time_diff = datetime.now(timezone.utc) - last_visit_date
-        max_age = timedelta(seconds=settings.click_id_max_age_seconds)
+        age = time.time() - last_visit_date.timestamp()
 
-        return time_diff <= max_age
+        return age <= settings.click_id_max_age_seconds
 
     @staticmethod
+    @lru_cache(maxsize=65536)
     def get_redirect_url(original_url: str) -> Optional[str]:
-        """Extract the redirect-url from the original_url query parameter."""
-        try:
-            parsed = urlparse(original_url)
-            query_params = parse_qs(parsed.query)
-
-            redirect_url = query_params.get("url", [None])[0]
-            if redirect_url is None:
-                return None
-
-            del query_params["url"]
-
-            string_params: Dict[str, str] = {}
-
-            for param, value in query_params.items():
-                string_params[param] = value[0] if len(value) == 1 else str(value)
+        """
+        Extract the redirect-url from the original_url query parameter.
 
-            return UrlBuilder.build_url(
-                redirect_url,
-                True,
-                string_params,
-                None,
-                False,
-            )
-        except Exception:
+        Pure in original_url, so results are memoized across requests.
+        """
+        # Same fragment-then-query split as build_url; unlike urlparse it
+        # cannot raise, so no exception handling is needed
+        query = original_url.partition("#")[0].partition("?")[2]
+
+        redirect_url: Optional[str] = None
+        string_params: Dict[str, str] = {}
+
+        for param, value in parse_qsl(query, keep_blank_values=True):
+            # The first url key is the target; repeats are never forwarded
+            if param == "url":
+                if redirect_url is None:
+                    redirect_url = value
+                continue
+            string_params[param] = value
+
+        if redirect_url is None:
             return None
+
+        return UrlBuilder.build_url(
+            redirect_url,
+            True,
+            string_params,
+            None,
+            False,
+        )
@@ -0,0 +1,99 @@
+"""
+Static files with cached lookups and precomputed strong ETags
+"""
+
+import hashlib
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+# File names carrying a content hash, e.g. app.3f2a9c1b.js
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that avoids a stat() syscall per request
+
+    - Successful path lookups are cached for `stat_ttl` seconds.
+    - Strong ETags are computed once at startup from file contents.
+    - Responses carry Cache-Control headers (immutable for hashed assets).
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str,
+        stat_ttl: float = 60.0,
+        max_age: int = 86400,
+    ):
+        super().__init__(directory=directory)
+        self.stat_ttl = stat_ttl
+        self.max_age = max_age
+        self._lookup_cache: Dict[str, Tuple[float, str, os.stat_result]] = {}
+        self._etags = self._compute_etags(os.path.realpath(directory))
+
+    @staticmethod
+    def _compute_etags(directory: str) -> Dict[str, str]:
+        """Hash every file under directory once, keyed by its real path"""
+        etags: Dict[str, str] = {}
+        pending = [directory]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        with open(entry.path, "rb") as f:
+                            digest = hashlib.file_digest(
+                                f, lambda: hashlib.blake2b(digest_size=16)
+                            )
+                        etags[os.path.realpath(entry.path)] = f'"{digest.hexdigest()}"'
+
+        return etags
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        now = time.monotonic()
+        cached = self._lookup_cache.get(path)
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+
+        full_path, stat_result = super().lookup_path(path)
+        # Only cache hits so arbitrary 404 paths cannot grow the cache
+        if stat_result is not None:
+            self._lookup_cache[path] = (now + self.stat_ttl, full_path, stat_result)
+
+        return full_path, stat_result
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result
+        )
+
+        etag = self._etags.get(str(full_path))
+        if etag:
+            response.headers["etag"] = etag
+
+        if HASHED_ASSET_RE.search(os.path.basename(full_path)):
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        response.headers["cache-control"] = cache_control
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+
+        return response
@@ -13,16 +13,21 @@ os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("APP_SCRIPT_URL", "http://localhost/script")
 os.environ.setdefault("APP_SCRIPT_API_KEY", "test-api-key")
 
+import re
 from typing import Any, Generator
+from urllib.parse import unquote
 import pytest
 from datetime import datetime, timezone
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import get_settings
-from app.models import Base, ShortUrl, ABTest
-from app.database import get_db
+from app.models import Base, ShortUrl, ABTest, Visit, VisitLocation
+from app.database import get_db, get_read_db
 from app.main import app
+from app.routers import sync
+from app.services.google_forms import GoogleFormsFieldMapper
+from app.services.redirect_cache import redirect_cache
 
 
 # Test database URL (use SQLite for testing)
@@ -45,6 +50,9 @@ def test_db() -> Generator[Session, Any, None]:
     finally:
         db.close()
         Base.metadata.drop_all(bind=test_engine)
+        # Ids are reused across tests, so cached redirect targets would leak
+        redirect_cache.clear()
+        GoogleFormsFieldMapper.clear_prefill_cache()
 
 
 @pytest.fixture(scope="function")
@@ -58,6 +66,7 @@ def client(test_db: Session) -> Generator[TestClient, Any, None]:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -126,6 +135,65 @@ class TestRedirect:
         assert response.status_code == 307
         assert "utm_source=test" in response.headers["location"]
 
+    def test_redirect_to_active_ab_test(
+        self,
+        client: TestClient,
+        test_db: Session,
+        sample_short_url: ShortUrl,
+    ) -> None:
+        """Test only active A/B tests take part in variant selection"""
+        test_db.add_all(
+            [
+                ABTest(
+                    short_url_id=sample_short_url.id,
+                    target_url="https://example.com/inactive",
+                    probability=1.0,
+                    is_active=False,
+                ),
+                ABTest(
+                    short_url_id=sample_short_url.id,
+                    target_url="https://example.com/variant",
+                    probability=1.0,
+                    is_active=True,
+                ),
+            ]
+        )
+        test_db.commit()
+
+        response = client.get(
+            "/",
+            params={"url": "https://example.com/original"},
+            follow_redirects=False,
+        )
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://example.com/variant"
+
+    def test_redirect_cache_invalidated_by_ab_test_changes(
+        self,
+        client: TestClient,
+        test_db: Session,
+        sample_short_url: ShortUrl,
+    ) -> None:
+        """Test cached redirect targets are dropped when A/B tests change"""
+        from app.services.ab_test_service import ABTestService
+        from app.schemas import ABTestCreate
+
+        params = {"url": "https://example.com/original"}
+        response = client.get("/", params=params, follow_redirects=False)
+        assert response.headers["location"] == "https://example.com/original"
+
+        ABTestService(test_db).create_test(
+            sample_short_url.id,
+            ABTestCreate(
+                target_url="https://example.com/variant",
+                probability=1.0,
+                is_active=True,
+            ),
+        )
+
+        response = client.get("/", params=params, follow_redirects=False)
+        assert response.headers["location"] == "https://example.com/variant"
+
 
 class TestABTest:
     """Test A/B testing functionality"""
@@ -193,6 +261,94 @@ class TestABTest:
         assert updated_test.probability == 0.3
         assert updated_test.is_active is False
 
+    def test_update_ab_test_route(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test the update route redirects on errors and 404s unknown tests"""
+        from sqlalchemy import select
+        from app.services.auth_service import AuthService
+
+        test_db.add_all(
+            [
+                ABTest(
+                    short_url_id=sample_short_url.id,
+                    target_url=f"https://example.com/variant-{i}",
+                    probability=0.5,
+                    is_active=True,
+                )
+                for i in range(2)
+            ]
+        )
+        test_db.commit()
+        test_id = test_db.scalar(select(ABTest.id).limit(1))
+
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        response = client.post(
+            f"/admin/ab_test/{test_id}/update",
+            data={"probability": "0.6"},
+            follow_redirects=False,
+        )
+        assert response.status_code == 303
+        location = unquote(response.headers["location"])
+        assert location.startswith(f"/admin/short_url/{sample_short_url.id}?error=")
+
+        response = client.post("/admin/ab_test/999/update", data={"probability": "0.1"})
+        assert response.status_code == 404
+
+    def test_update_ab_test_error_names_short_url(
+        self,
+        client: TestClient,
+        test_db: Session,
+        sample_short_url: ShortUrl,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test a failed update redirects from the error, without re-reading"""
+        from app.schemas import ABTestUpdate
+        from app.services.ab_test_service import ABTestService, ABTestValidationError
+        from app.services.auth_service import AuthService
+
+        ab_tests = [
+            ABTest(
+                short_url_id=sample_short_url.id,
+                target_url=f"https://example.com/variant-{i}",
+                probability=0.5,
+                is_active=True,
+            )
+            for i in range(2)
+        ]
+        test_db.add_all(ab_tests)
+        test_db.commit()
+        test_id = ab_tests[0].id
+
+        with pytest.raises(ABTestValidationError) as exc_info:
+            ABTestService(test_db).update_test(
+                test_id, ABTestUpdate(target_url=None, probability=0.6, is_active=None)
+            )
+        assert exc_info.value.short_url_id == sample_short_url.id
+        test_db.rollback()
+
+        with pytest.raises(ABTestValidationError) as exc_info:
+            ABTestService(test_db).update_test(
+                999, ABTestUpdate(target_url=None, probability=0.1, is_active=None)
+            )
+        assert exc_info.value.short_url_id is None
+
+        def no_reread(self: ABTestService, test_id: int) -> None:
+            raise AssertionError("update error path re-read the A/B test")
+
+        monkeypatch.setattr(ABTestService, "get_test_by_id", no_reread)
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        response = client.post(
+            f"/admin/ab_test/{test_id}/update",
+            data={"probability": "0.6"},
+            follow_redirects=False,
+        )
+        assert response.status_code == 303
+        location = unquote(response.headers["location"])
+        assert location.startswith(f"/admin/short_url/{sample_short_url.id}?error=")
+
     def test_delete_ab_test(self, test_db: Session, sample_short_url: ShortUrl) -> None:
         """Test deleting an A/B test"""
         from app.services.ab_test_service import ABTestService
@@ -229,6 +385,222 @@ class TestAdminAuth:
         assert response.status_code == 303
         assert response.has_redirect_location
 
+    def test_invalidated_session_is_rejected(self) -> None:
+        """Test that logout revokes a session even after a cached verification"""
+        from app.services.auth_service import AuthService
+
+        session = AuthService.create_session()
+        assert AuthService.verify_session(session) is True
+
+        AuthService.invalidate_session(session)
+        assert AuthService.verify_session(session) is False
+
+    def test_expired_revocations_are_purged(self) -> None:
+        """Test that revoking a session drops already expired revocations"""
+        import heapq
+        from app.services.auth_service import AuthService
+
+        AuthService._revoked_tokens["expired-jti"] = 1
+        heapq.heappush(AuthService._revoked_heap, (1, "expired-jti"))
+
+        AuthService.invalidate_session(AuthService.create_session())
+        assert "expired-jti" not in AuthService._revoked_tokens
+        assert all(jti != "expired-jti" for _, jti in AuthService._revoked_heap)
+
+
+class TestDashboard:
+    """Test admin dashboard rendering"""
+
+    def test_dashboard_lists_short_urls_with_tests(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test dashboard shows short URLs with their A/B test data"""
+        from app.services.auth_service import AuthService
+
+        test_db.add_all(
+            [
+                ABTest(
+                    short_url_id=sample_short_url.id,
+                    target_url="https://example.com/variant-a",
+                    probability=0.25,
+                    is_active=True,
+                ),
+                ABTest(
+                    short_url_id=sample_short_url.id,
+                    target_url="https://example.com/variant-b",
+                    probability=0.5,
+                    is_active=False,
+                ),
+            ]
+        )
+        test_db.commit()
+
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        response = client.get("/admin/dashboard", follow_redirects=False)
+
+        assert response.status_code == 200
+        assert sample_short_url.short_code.encode() in response.content
+        assert b"https://example.com/original" in response.content
+        assert b"25.0%" in response.content
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_dashboard_keyset_pagination(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test dashboard pages through short URLs with a cursor"""
+        from app.services.auth_service import AuthService
+
+        app_url = str(get_settings().app_url).rstrip("/")
+        for i in range(2, 4):
+            test_db.add(
+                ShortUrl(
+                    id=i,
+                    original_url=f"{app_url}/?url=https://example.com/{i}",
+                    short_code=f"code{i}",
+                    date_created=sample_short_url.date_created,
+                    forward_query=True,
+                    title_was_auto_resolved=False,
+                    crawlable=False,
+                )
+            )
+        test_db.commit()
+
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        first = client.get("/admin/dashboard", params={"limit": 2})
+        assert first.status_code == 200
+        assert b"code3" in first.content and b"code2" in first.content
+        assert b"<strong>test</strong>" not in first.content
+
+        next_link = re.search(r'href="\?cursor=([^&"]+)', first.text)
+        assert next_link is not None
+        second = client.get(
+            "/admin/dashboard",
+            params={"cursor": unquote(next_link.group(1)), "limit": 2},
+        )
+        assert second.status_code == 200
+        assert b"<strong>test</strong>" in second.content
+        assert b"code2" not in second.content
+        assert b"?cursor=" not in second.content
+
+        invalid = client.get("/admin/dashboard", params={"cursor": "bogus"})
+        assert invalid.status_code == 400
+
+        for limit in (0, 101):
+            response = client.get("/admin/dashboard", params={"limit": limit})
+            assert response.status_code == 422
+
+    def test_short_url_detail_lists_tests(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test detail page shows the short URL's A/B tests"""
+        from app.services.auth_service import AuthService
+
+        test_db.add(
+            ABTest(
+                short_url_id=sample_short_url.id,
+                target_url="https://example.com/variant-a",
+                probability=0.25,
+                is_active=True,
+            )
+        )
+        test_db.commit()
+
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        response = client.get(
+            f"/admin/short_url/{sample_short_url.id}", follow_redirects=False
+        )
+
+        assert response.status_code == 200
+        assert b"https://example.com/variant-a" in response.content
+
+
+class TestGoogleForms:
+    """Test Google Forms admin routes"""
+
+    def test_refresh_all_without_forms(
+        self, client: TestClient, test_db: Session
+    ) -> None:
+        """Test bulk refresh with no stored forms makes no API calls"""
+        from app.services.auth_service import AuthService
+
+        settings = get_settings()
+        client.cookies.set(settings.session_cookie_name, AuthService.create_session())
+        response = client.post("/admin/google_forms/refresh_all")
+
+        assert response.status_code == 200
+        assert response.json() == {"success": True, "refreshed": 0, "errors": {}}
+
+    def test_prefill_connected_form(self, test_db: Session) -> None:
+        """Test UTM params are mapped to stored entry IDs of a connected form"""
+        from app.models import GoogleForm
+        from app.models.form_entry import FormEntry
+        from app.services.url_builder import UrlBuilder
+
+        form = GoogleForm(form_id="edit-id", responder_form_id="resp-id", title="F")
+        test_db.add(form)
+        test_db.flush()
+        test_db.add(FormEntry(google_form_id=form.id, entry_id=111, title="utm_source"))
+        test_db.commit()
+
+        query_params = {"utm_source": "mail", "utm_medium": "email"}
+        url = UrlBuilder.build_url(
+            "https://docs.google.com/forms/d/e/resp-id/viewform",
+            False,
+            query_params,
+            db=test_db,
+        )
+
+        assert "entry.111=mail" in url
+        assert "utm_medium" not in url
+        # The caller's query params are left untouched
+        assert query_params == {"utm_source": "mail", "utm_medium": "email"}
+
+    def test_update_mapping(self, test_db: Session) -> None:
+        """Test refreshed mappings insert, update and delete stored entries"""
+        from sqlalchemy import select
+        from app.models import GoogleForm
+        from app.models.form_entry import FormEntry
+
+        form = GoogleForm(form_id="edit-id", responder_form_id="resp-id", title="F")
+        test_db.add(form)
+        test_db.flush()
+        test_db.add_all(
+            [
+                FormEntry(google_form_id=form.id, entry_id=1, title="utm_source"),
+                FormEntry(google_form_id=form.id, entry_id=2, title="utm_medium"),
+            ]
+        )
+        test_db.commit()
+
+        # Cache the prefill parameters before the refresh
+        cached = GoogleFormsFieldMapper.get_prefill_params_by_responder_id(
+            test_db, "resp-id"
+        )
+        assert cached is not None and cached[1]["utm_source"] == "entry.1"
+
+        mapper = GoogleFormsFieldMapper("http://localhost/script", "key")
+        mapper.update_mapping(
+            test_db,
+            "edit-id",
+            {
+                "mapping": [
+                    {"title": "utm_source", "entryId": 10},
+                    {"title": "click_id", "entryId": 3},
+                    {"title": "other", "entryId": 4},
+                ]
+            },
+        )
+
+        test_db.expire_all()
+        entries = test_db.execute(select(FormEntry.title, FormEntry.entry_id)).all()
+        assert sorted(entries) == [("click_id", 3), ("utm_source", 10)]
+        assert GoogleFormsFieldMapper.get_prefill_params_by_responder_id(
+            test_db, "resp-id"
+        ) == ("edit-id", {"utm_source": "entry.10", "click_id": "entry.3"})
+
 
 class TestRedirectService:
     """Test redirect service logic"""
@@ -265,6 +637,169 @@ class TestRedirectService:
         # Same IP should get same result
         assert result1 == result2
 
+    def test_redirect_cache_sweeps_expired_entries(self) -> None:
+        """Test expired redirect cache entries are dropped on the next insert"""
+        from app.services.redirect_cache import RedirectCache, RedirectTarget
+
+        cache = RedirectCache(ttl=30, max_size=10)
+        target = RedirectTarget(1, "test", None, (), ())
+        cache.set("a", None, target)
+        cache.set("b", None, target)
+        # Expire only "a"
+        cache._entries[("a", None)] = (0.0, target)
+
+        cache.set("c", None, target)
+
+        assert list(cache._entries) == [("b", None), ("c", None)]
+        assert cache.get("b", None) == target
+
+    def test_redirect_url_drops_repeated_url_keys(self) -> None:
+        """Test only the first url key is the target and none are forwarded"""
+        from app.services.url_builder import UrlBuilder
+
+        redirect_url = UrlBuilder.get_redirect_url(
+            "https://s.example.com/go?url=https%3A%2F%2Fa.example.com%2F"
+            "&url=https%3A%2F%2Fb.example.com%2F&ref=repeat"
+        )
+
+        assert redirect_url == "https://a.example.com/?ref=repeat"
+
+
+class TestSync:
+    """Test sync API"""
+
+    def test_sync_rejects_invalid_token(self, client: TestClient) -> None:
+        """Test sync endpoints reject a wrong X-Api-Token"""
+        response = client.get("/sync/short-urls", headers={"X-Api-Token": "wrong"})
+        assert response.status_code == 401
+
+    def test_sync_short_urls_cursor(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test short URLs sync pages with next_cursor/min_id"""
+        for i in range(2, 4):
+            test_db.add(
+                ShortUrl(
+                    id=i,
+                    original_url=f"https://example.com/{i}",
+                    short_code=f"code{i}",
+                    date_created=datetime.now(timezone.utc),
+                    forward_query=True,
+                    title_was_auto_resolved=False,
+                    crawlable=False,
+                )
+            )
+        test_db.commit()
+
+        headers = {"X-Api-Token": get_settings().api_token}
+        first = client.get("/sync/short-urls", params={"limit": 2}, headers=headers)
+        assert first.status_code == 200
+        assert [row["id"] for row in first.json()["data"]] == [1, 2]
+        assert first.json()["next_cursor"] == 2
+
+        second = client.get(
+            "/sync/short-urls",
+            params={"limit": 2, "min_id": first.json()["next_cursor"]},
+            headers=headers,
+        )
+        assert [row["id"] for row in second.json()["data"]] == [3]
+        assert second.json()["next_cursor"] == 3
+
+    def test_sync_visits_with_location(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test visits sync embeds the eagerly loaded location"""
+        test_db.add(
+            Visit(
+                id=1,
+                date=datetime.now(timezone.utc),
+                type="valid_short_url",
+                short_url_id=sample_short_url.id,
+            )
+        )
+        test_db.flush()
+        test_db.add(VisitLocation(id=1, country_code="UA", lat=50.45, lon=30.52))
+        test_db.commit()
+
+        headers = {"X-Api-Token": get_settings().api_token}
+        response = client.get("/sync/visits", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["data"][0]["location"]["country_code"] == "UA"
+
+        response = client.get("/sync/visit-locations", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["data"][0]["id"] == 1
+
+    def test_sync_visits_not_modified(
+        self, client: TestClient, test_db: Session, sample_short_url: ShortUrl
+    ) -> None:
+        """Test visits sync answers 304 until the page's visits change"""
+        headers = {"X-Api-Token": get_settings().api_token}
+        plain = client.get("/sync/visits", headers=headers)
+        assert "etag" not in plain.headers
+
+        # Any If-None-Match opts in to ETags
+        first = client.get("/sync/visits", headers={**headers, "If-None-Match": '"0"'})
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        response = client.get(
+            "/sync/visits", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        for visit_id in (1, 2):
+            test_db.add(
+                Visit(
+                    id=visit_id,
+                    date=datetime.now(timezone.utc),
+                    type="valid_short_url",
+                    short_url_id=sample_short_url.id,
+                )
+            )
+        test_db.commit()
+
+        response = client.get(
+            "/sync/visits", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        # Deleting a visit below the highest ID still changes the page
+        visit = test_db.get(Visit, 1)
+        assert visit is not None
+        test_db.delete(visit)
+        test_db.commit()
+
+        response = client.get(
+            "/sync/visits", headers={**headers, "If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_sync_total_only_on_request(
+        self, client: TestClient, sample_short_url: ShortUrl
+    ) -> None:
+        """Test cursor pages omit the total unless include_total is set"""
+        sync._total_cache.clear()
+        headers = {"X-Api-Token": get_settings().api_token}
+
+        response = client.get("/sync/short-urls", params={"min_id": 0}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] is None
+
+        response = client.get(
+            "/sync/short-urls",
+            params={"min_id": 0, "include_total": True},
+            headers=headers,
+        )
+        assert response.json()["total"] == 1
+
+        # Offset paging without min_id keeps the total for older clients
+        response = client.get("/sync/short-urls", params={"offset": 1}, headers=headers)
+        assert response.json()["total"] == 1
+        assert response.json()["data"] == []
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -14,6 +14,10 @@
  *
  * Example call (curl):
  *  curl "https://script.google.com/macros/s/DEPLOY_ID/exec?formId=FORM_ID&token=your-secret-token"
+ *
+ * Batch call (one request for several forms, comma-separated IDs):
+ *  GET https://script.google.com/macros/s/DEPLOY_ID/exec?formIds=ID1,ID2&token=your-secret-token
+ *  -> { status: 200, forms: { ID1: { status: 200, ... }, ID2: { status: 500, error: ... } } }
  */
 
 /**
@@ -37,9 +41,10 @@ function handleRequest_(e) {
   try {
     const params = normalizeParams_(e);
     const formId = params.formId;
+    const formIds = params.formIds;
     const token = params.token;
 
-    if (!formId) {
+    if (!formId && !formIds) {
       return jsonResponse_({ error: 'Missing parameter: formId' }, 400);
     }
 
@@ -52,71 +57,94 @@ function handleRequest_(e) {
       return jsonResponse_({ error: 'Unauthorized: invalid token' }, 401);
     }
 
-    // Open the form (script owner must have Editor access)
-    const form = FormApp.openById(formId);
-    const formTitle = form.getTitle();
-
-    // Collect items and add default responses for prefillable items
-    const items = form.getItems();
-    const response = form.createResponse();
-    const records = []; // { title, itemId, type, entryId, _defaultResponse }
-
-    for (let i = 0; i < items.length; i++) {
-      const item = items[i];
-      const defaultResponse = getDefaultItemResponse_(item);
-      records.push({
-        title: item.getTitle ? item.getTitle() : '',
-        itemId: item.getId ? item.getId().toString() : null,
-        type: item.getType ? item.getType().toString() : null,
-        entryId: null,                // to be filled per-item below
-        _defaultResponse: defaultResponse  // store the actual ItemResponse (or null)
-      });
-      if (defaultResponse) {
-        // add to the big response so prefilledUrl includes them (optional)
-        response.withItemResponse(defaultResponse);
-      }
-    }
-
-    // If you still want the full prefilled URL that includes all added responses:
-    const prefilledUrl = response.toPrefilledUrl();
-
-    // --- New robust approach: for each item that had a default response,
-    // create a single-item prefilled URL and extract its entry.<digits> ID ---
-    const singleRe = /[?&]entry\.([0-9]+)=/;
-    for (let i = 0; i < records.length; i++) {
-      const rec = records[i];
-      if (rec._defaultResponse) {
+    // Batch mode: describe every form, reporting failures per form
+    if (formIds) {
+      const ids = Array.isArray(formIds) ? formIds : String(formIds).split(',');
+      const forms = {};
+      for (let i = 0; i < ids.length; i++) {
+        const id = ids[i];
+        if (!id) continue;
         try {
-          // create a response that only includes this one item response
-          const singleUrl = form.createResponse()
-            .withItemResponse(rec._defaultResponse)
-            .toPrefilledUrl();
-
-          const m = singleRe.exec(singleUrl);
-          rec.entryId = m ? m[1] : null;
+          forms[id] = Object.assign({ status: 200 }, describeForm_(id));
         } catch (err) {
-          // something went wrong with this item; leave entryId null
-          rec.entryId = null;
+          forms[id] = { status: 500, error: err.message };
         }
-      } else {
-        rec.entryId = null;
       }
-      // remove the helper to keep output clean
-      delete rec._defaultResponse;
+      return jsonResponse_({ forms: forms }, 200);
     }
 
-    return jsonResponse_({
-      formId: formId,
-      title: formTitle,
-      prefilledUrl: prefilledUrl,
-      mapping: records
-    }, 200);
+    return jsonResponse_(describeForm_(formId), 200);
 
   } catch (err) {
     return jsonResponse_({ error: err.message, stack: err.stack }, 500);
   }
 }
 
+/**
+ * Read a form's title, prefilled URL and title -> entry ID mapping
+ */
+function describeForm_(formId) {
+  // Open the form (script owner must have Editor access)
+  const form = FormApp.openById(formId);
+  const formTitle = form.getTitle();
+
+  // Collect items and add default responses for prefillable items
+  const items = form.getItems();
+  const response = form.createResponse();
+  const records = []; // { title, itemId, type, entryId, _defaultResponse }
+
+  for (let i = 0; i < items.length; i++) {
+    const item = items[i];
+    const defaultResponse = getDefaultItemResponse_(item);
+    records.push({
+      title: item.getTitle ? item.getTitle() : '',
+      itemId: item.getId ? item.getId().toString() : null,
+      type: item.getType ? item.getType().toString() : null,
+      entryId: null,                // to be filled per-item below
+      _defaultResponse: defaultResponse  // store the actual ItemResponse (or null)
+    });
+    if (defaultResponse) {
+      // add to the big response so prefilledUrl includes them (optional)
+      response.withItemResponse(defaultResponse);
+    }
+  }
+
+  // If you still want the full prefilled URL that includes all added responses:
+  const prefilledUrl = response.toPrefilledUrl();
+
+  // --- New robust approach: for each item that had a default response,
+  // create a single-item prefilled URL and extract its entry.<digits> ID ---
+  const singleRe = /[?&]entry\.([0-9]+)=/;
+  for (let i = 0; i < records.length; i++) {
+    const rec = records[i];
+    if (rec._defaultResponse) {
+      try {
+        // create a response that only includes this one item response
+        const singleUrl = form.createResponse()
+          .withItemResponse(rec._defaultResponse)
+          .toPrefilledUrl();
+
+        const m = singleRe.exec(singleUrl);
+        rec.entryId = m ? m[1] : null;
+      } catch (err) {
+        // something went wrong with this item; leave entryId null
+        rec.entryId = null;
+      }
+    } else {
+      rec.entryId = null;
+    }
+    // remove the helper to keep output clean
+    delete rec._defaultResponse;
+  }
+
+  return {
+    formId: formId,
+    title: formTitle,
+    prefilledUrl: prefilledUrl,
+    mapping: records
+  };
+}
+
 /**
  * Produce a ContentService JSON response with proper HTTP status (Apps Script mimics)
  */
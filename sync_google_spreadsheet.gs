@@ -188,24 +188,24 @@ function syncFullTable(ss, tableName, config, syncMetadata) {
   if (!sheet) sheet = ss.insertSheet(tableName);
 
   var allRecords = [];
-  var offset = 0;
+  var cursor = 0;
   var hasMore = true;
 
   while (hasMore) {
     var params = {
       limit: API_CONFIG.batchSize,
-      offset: offset
+      min_id: cursor
     };
     
     var result = callSyncAPI(config.endpoint, params);
     allRecords = allRecords.concat(result.data);
     
-    Logger.log(`Fetched ${result.data.length} records (offset: ${offset}, total so far: ${allRecords.length})`);
+    Logger.log(`Fetched ${result.data.length} records (after id: ${cursor}, total so far: ${allRecords.length})`);
     
-    offset += result.data.length;
-    
-    if (result.data.length < API_CONFIG.batchSize || offset >= result.total) {
+    if (result.data.length < API_CONFIG.batchSize || result.next_cursor === null) {
       hasMore = false;
+    } else {
+      cursor = result.next_cursor;
     }
   }
 